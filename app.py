@@ -14,22 +14,51 @@ Usage:
     streamlit run app.py
 """
 
-import os
-from typing import Any, Dict, List
+from __future__ import annotations
 
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import replace
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import pandas as pd
 import streamlit as st
 
 from news_replay import (
     NewsCase,
     load_news_cases,
-    filter_cases,
+    index_cases,
     summarize_cases,
     analyze_pattern_with_llm,
-    get_symbol_stats,
 )
-from strategies.ai_pm import decide_strategy, reset_state
-from strategies.router import StrategyRouter
-from infra.position_sizing import calculate_kelly_position
+
+if TYPE_CHECKING:
+    from strategies.base import OrderInstruction
+    from strategies.router import StrategyRouter
+
+
+@st.cache_resource
+def _strategies() -> SimpleNamespace:
+    """
+    Strategy stack, imported on first use rather than at module load.
+
+    `strategies` pulls in the AI PM and its optional LLM SDK, so deferring it
+    lets Streamlit paint the title and intro before those finish loading.
+    """
+    from strategies.ai_pm import decide_strategy, reset_state
+    from strategies.router import StrategyRouter
+    from infra.position_sizing import calculate_kelly_position
+
+    return SimpleNamespace(
+        decide_strategy=decide_strategy,
+        reset_state=reset_state,
+        StrategyRouter=StrategyRouter,
+        calculate_kelly_position=calculate_kelly_position,
+    )
 
 
 # =============================================================================
@@ -42,6 +71,153 @@ def _load_cases() -> List[NewsCase]:
     return load_news_cases()
 
 
+@st.cache_data
+def _cases_by_symbol() -> Dict[str, List[NewsCase]]:
+    """Index the loaded cases by symbol, preserving dataset order."""
+    return index_cases(_load_cases()).by_symbol
+
+
+# source_tag keyword -> tag kind, matched once per case at load time
+_TAG_KIND_PATTERNS = {
+    "positive": re.compile(r"利好|positive", re.IGNORECASE),
+    "negative": re.compile(r"利空|negative", re.IGNORECASE),
+    "fud": re.compile(r"fud", re.IGNORECASE),
+}
+
+# Custom News Lab event type -> tag kinds it filters on (others use all symbol cases)
+_EVENT_TYPE_TAG_KINDS = {
+    "Positive macro / ETF news": frozenset({"positive"}),
+    "Negative regulation / FUD": frozenset({"negative", "fud"}),
+}
+
+
+@st.cache_data
+def _tag_kinds() -> Dict[str, frozenset]:
+    """Map case_id -> frozenset of tag kinds derived from its source_tag."""
+    return {
+        c.case_id: frozenset(
+            kind for kind, pattern in _TAG_KIND_PATTERNS.items() if pattern.search(c.source_tag)
+        )
+        for c in _load_cases()
+    }
+
+
+def _case_ids(cases: List[NewsCase]) -> Tuple[str, ...]:
+    """Stable, hashable cache key for a subset of cases."""
+    return tuple(c.case_id for c in cases)
+
+
+@st.cache_data
+def _symbol_stats_df() -> pd.DataFrame:
+    """
+    Per-symbol statistics over the full dataset, computed once.
+
+    Same columns as news_replay.get_symbol_stats (symbol, count, avg_return_3d),
+    aggregated with a single pandas groupby; rows are sorted by symbol.
+    """
+    cases = _load_cases()
+    df = pd.DataFrame({
+        "symbol": [c.symbol for c in cases],
+        # allow None but treat as 0.0
+        "return_3d": [c.return_3d or 0.0 for c in cases],
+    })
+    return (
+        df.groupby("symbol", sort=True)["return_3d"]
+        .agg(count="size", avg_return_3d="mean")
+        .reset_index()
+    )
+
+
+MIN_SAMPLES = 2  # Radar: filter out single-sample noise
+
+
+@st.cache_data
+def _radar_top() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Radar rows (top 3 by avg 3D return among well-sampled symbols, top 3 by count), computed once."""
+    stats_df = _symbol_stats_df()
+    candidates = stats_df[stats_df["count"] >= MIN_SAMPLES]
+    return (
+        candidates.nlargest(3, "avg_return_3d").to_dict("records"),
+        stats_df.nlargest(3, "count").to_dict("records"),
+    )
+
+
+def _select_cases(case_ids: Tuple[str, ...]) -> List[NewsCase]:
+    """Resolve case ids back to NewsCase objects, preserving dataset order."""
+    wanted = set(case_ids)
+    return [c for c in _load_cases() if c.case_id in wanted]
+
+
+@st.cache_data
+def _summarize(case_ids: Tuple[str, ...]) -> Dict[str, float]:
+    """Summary statistics for a subset of cases, keyed by case ids."""
+    return summarize_cases(_select_cases(case_ids))
+
+
+def _format_case_option(c: NewsCase) -> str:
+    """Selectbox label for a historical event: id · date · truncated headline."""
+    title = c.news_headline[:40] + "..." if len(c.news_headline) > 40 else c.news_headline
+    return f"{c.case_id} · {c.event_date} · {title}"
+
+
+@st.cache_data
+def _case_option_labels(symbol: str, case_ids: Tuple[str, ...]) -> List[str]:
+    """Selectbox labels for a symbol's cases; case_ids keys the cache to the case set."""
+    return [_format_case_option(c) for c in _cases_by_symbol()[symbol]]
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_pattern(symbol: str, case_ids: Tuple[str, ...], force_llm: bool) -> Dict[str, Any]:
+    """
+    Pattern analysis memoized per (symbol, case subset, force_llm).
+
+    In-memory tier over news_replay's own LLM pattern store; repeat selections
+    skip any LLM roundtrip. Exceptions are not cached,
+    so callers keep their own fallback handling.
+    """
+    cases = [c for c in _select_cases(case_ids) if c.symbol == symbol]
+    return analyze_pattern_with_llm(cases, force_llm=force_llm)
+
+
+# Gemini pattern calls run off the render thread; the tab shows the rule-based
+# pattern meanwhile and reruns itself once the result lands.
+_USE_LLM = os.environ.get("AI_PM_USE_LLM", "0") == "1"
+_LLM_POLL_SECONDS = 1.0
+
+
+@st.cache_resource
+def _llm_pool() -> ThreadPoolExecutor:
+    """Worker pool shared by all sessions for Gemini pattern analysis."""
+    return ThreadPoolExecutor(max_workers=3, thread_name_prefix="llm-pattern")
+
+
+def _llm_succeeded(future: Future) -> bool:
+    """True if a finished pattern future holds a Gemini result (not an error or fallback)."""
+    return future.exception() is None and future.result().get("analysis_method") == "llm"
+
+
+def _submit_llm_pattern(key: Tuple[Any, ...], cases: List[NewsCase]) -> None:
+    """
+    Queue a Gemini analysis for `key` unless one is running or already succeeded.
+
+    Failed calls usually come back as a rule_based_fallback pattern rather than
+    an exception (rate limit, API error, bad JSON), so those are retried too.
+    """
+    pending: Dict[Tuple[Any, ...], Future] = st.session_state.setdefault("pending_patterns", {})
+    future = pending.get(key)
+    if future is None or (future.done() and not _llm_succeeded(future)):
+        pending[key] = _llm_pool().submit(analyze_pattern_with_llm, cases, force_llm=True)
+
+
+def _rerun_when_llm_lands(key: Optional[Tuple[Any, ...]]) -> None:
+    """Wait briefly on the running Gemini call for `key`, then rerun the fragment to pick it up."""
+    future = st.session_state.get("pending_patterns", {}).get(key)
+    if future is not None and not future.done():
+        wait([future], timeout=_LLM_POLL_SECONDS)
+        st.rerun(scope="fragment")
+
+
+@lru_cache(maxsize=512)
 def format_pct(value: float) -> str:
     """Format a decimal return as a percentage string with sign."""
     if value is None:
@@ -50,272 +226,516 @@ def format_pct(value: float) -> str:
     return f"+{pct:.1f}%" if pct >= 0 else f"{pct:.1f}%"
 
 
-def build_demo_market_state(latest_case: NewsCase, hist_pattern: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Build a demo market state based on the latest case and historical pattern.
-
-    This mimics the logic from demo_news_driven.py to create realistic market conditions
-    based on the pattern's expected returns.
-    """
-    avg_3d = hist_pattern.get("avg_return_3d", 0) or 0
-    confidence = hist_pattern.get("confidence_level", "low")
-
-    # Determine market state based on pattern strength
-    if avg_3d > 0.10 and confidence in {"medium", "high"}:
-        pm_ask, op_bid, best_ask, mode = 0.45, 0.60, 0.40, "arb"
-    elif avg_3d > 0.05:
-        pm_ask, op_bid, best_ask, mode = 0.48, 0.55, 0.46, "arb"
-    elif avg_3d < -0.05:
-        pm_ask, op_bid, best_ask, mode = 0.50, 0.51, 0.52, None
-    else:
-        pm_ask, op_bid, best_ask, mode = 0.50, 0.51, 0.38, "sniper"
+# Keys shared by every synthetic market state.
+_MARKET_TEMPLATE = {"gas_cost_usd": 0.0}
 
-    spread = op_bid - pm_ask
 
+def _regime_quotes(pm_ask: float, op_bid: float, best_ask: float, mode: Any) -> Dict[str, Any]:
+    """Expand a regime's anchor prices into the full set of quote fields."""
     return {
         "mode": mode,
         "pm_ask": pm_ask,
         "pm_bid": pm_ask - 0.01,
         "op_ask": op_bid + 0.02,
         "op_bid": op_bid,
-        "spread": spread,
+        "spread": op_bid - pm_ask,
         "best_ask": best_ask,
         "best_bid": best_ask - 0.01,
-        "symbol": latest_case.symbol,
-        "event_date": latest_case.event_date,
-        "news_headline": latest_case.news_headline,
-        "news_summary": latest_case.news_summary,
-        "historical_pattern": hist_pattern,
-        "gas_cost_usd": 0.0,
     }
 
 
-def build_custom_market_state(
-    selected_symbol: str,
-    pattern: Dict[str, Any],
-    custom_headline: str,
-    custom_summary: str,
-    reference_case: NewsCase,
-) -> Dict[str, Any]:
-    """Build a synthetic market state for custom news scenarios."""
+# Pattern strength -> synthetic market regime, checked in order.
+# Each row: (avg_3d lower bound, avg_3d upper bound, required confidence levels or None,
+#            quote fields). Bounds are exclusive.
+_MARKET_REGIMES = (
+    (0.10, float("inf"), {"medium", "high"}, _regime_quotes(0.45, 0.60, 0.40, "arb")),
+    (0.05, float("inf"), None, _regime_quotes(0.48, 0.55, 0.46, "arb")),
+    (float("-inf"), -0.05, None, _regime_quotes(0.50, 0.51, 0.52, None)),
+)
+_NEUTRAL_REGIME = _regime_quotes(0.50, 0.51, 0.38, "sniper")
+
+
+def _pick_regime(pattern: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a historical pattern to its precomputed quote fields (shared; do not mutate)."""
     avg_3d = pattern.get("avg_return_3d", 0) or 0
     confidence = pattern.get("confidence_level", "low")
 
-    # Determine market state based on pattern strength
-    if avg_3d > 0.10 and confidence in {"medium", "high"}:
-        pm_ask, op_bid, best_ask, mode = 0.45, 0.60, 0.40, "arb"
-    elif avg_3d > 0.05:
-        pm_ask, op_bid, best_ask, mode = 0.48, 0.55, 0.46, "arb"
-    elif avg_3d < -0.05:
-        pm_ask, op_bid, best_ask, mode = 0.50, 0.51, 0.52, None
-    else:
-        pm_ask, op_bid, best_ask, mode = 0.50, 0.51, 0.38, "sniper"
+    for low, high, levels, regime in _MARKET_REGIMES:
+        if low < avg_3d < high and (levels is None or confidence in levels):
+            return regime
+    return _NEUTRAL_REGIME
 
-    spread = op_bid - pm_ask
 
+def _market_state(
+    pattern: Dict[str, Any],
+    symbol: str,
+    event_date: str,
+    news_headline: str,
+    news_summary: str,
+) -> Dict[str, Any]:
+    """Build a market state dict from the pattern-driven regime and news context."""
     return {
-        "mode": mode,
-        "pm_ask": pm_ask,
-        "pm_bid": pm_ask - 0.01,
-        "op_ask": op_bid + 0.02,
-        "op_bid": op_bid,
-        "spread": spread,
-        "best_ask": best_ask,
-        "best_bid": best_ask - 0.01,
-        "symbol": selected_symbol,
-        "event_date": reference_case.event_date,
-        "news_headline": custom_headline or f"Custom scenario for {selected_symbol}",
-        "news_summary": custom_summary or reference_case.news_summary,
+        **_pick_regime(pattern),
+        "symbol": symbol,
+        "event_date": event_date,
+        "news_headline": news_headline,
+        "news_summary": news_summary,
         "historical_pattern": pattern,
-        "gas_cost_usd": 0.0,
+        **_MARKET_TEMPLATE,
     }
 
 
-# =============================================================================
-# Main App
-# =============================================================================
+def build_demo_market_state(latest_case: NewsCase, hist_pattern: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a demo market state based on the latest case and historical pattern.
 
-def main():
-    st.set_page_config(
-        page_title="News-Driven AI PM",
-        layout="wide",
-        initial_sidebar_state="expanded",
+    This mimics the logic from demo_news_driven.py to create realistic market conditions
+    based on the pattern's expected returns.
+    """
+    return _market_state(
+        hist_pattern,
+        latest_case.symbol,
+        latest_case.event_date,
+        latest_case.news_headline,
+        latest_case.news_summary,
     )
 
-    # ========== Top: Title + Intro ==========
-    st.title("🧠 News-Driven AI Portfolio Manager")
-    st.markdown(
-        "An AI portfolio manager that reads news, learns from historical price reactions, "
-        "and routes capital across arbitrage and sniper strategies."
+
+def build_custom_market_state(
+    selected_symbol: str,
+    pattern: Dict[str, Any],
+    custom_headline: str,
+    custom_summary: str,
+    reference_case: NewsCase,
+) -> Dict[str, Any]:
+    """Build a synthetic market state for custom news scenarios."""
+    return _market_state(
+        pattern,
+        selected_symbol,
+        reference_case.event_date,
+        custom_headline or f"Custom scenario for {selected_symbol}",
+        custom_summary or reference_case.news_summary,
     )
 
-    # ========== Load Data ==========
-    cases = _load_cases()
-    if not cases:
-        st.error("❌ No news cases loaded. Please check data/news_cases.csv.")
-        return
 
-    symbols = sorted({c.symbol for c in cases})
-    symbol_stats = get_symbol_stats(cases)
+# === Kelly-based sizing for UI demo only ===
+BASE_CAPITAL = 10_000.0  # Demo account with $10k
+MIN_FRACTION = 0.02  # Minimum edge threshold (2%)
 
-    # ========== Sidebar: LLM Status ==========
-    st.sidebar.header("⚙️ System Status")
 
-    # LLM Status
-    use_llm = os.environ.get("AI_PM_USE_LLM", "0") == "1"
-    has_key = bool(os.environ.get("GEMINI_API_KEY"))
-    st.sidebar.info(f"""
-**LLM Mode:** {"ON" if use_llm else "OFF"}
-**API Key:** {"[set]" if has_key else "[not set]"}
+@st.cache_resource
+def _router_instance() -> Tuple[StrategyRouter, threading.Lock]:
+    """Process-wide StrategyRouter, constructed once, and the lock guarding it."""
+    return _strategies().StrategyRouter(verbose=False), threading.Lock()
 
-*LLM mode is controlled via environment variables.*
-    """)
 
-    # ========== Top Opportunities Radar ==========
-    st.markdown("### 📡 Top Opportunities Radar")
+def _route_tick(market_state: Dict[str, Any]) -> List[OrderInstruction]:
+    """
+    Route one tick on the shared router, starting from cleared per-tick stats.
 
-    col_left, col_right = st.columns(2)
+    Sessions share the router, so reset and tick run under its lock; otherwise
+    one session's reset_stats() could land in the middle of another's tick.
+    """
+    router, lock = _router_instance()
+    with lock:
+        router.reset_stats()
+        return router.on_tick(market_state)
 
-    MIN_SAMPLES = 2  # Filter out single-sample noise
 
-    # Left column: Top symbols by avg_return_3d
-    with col_left:
-        st.markdown("**📈 Top avg 3D return**")
+@st.cache_data
+def _kelly(confidence: float, win_loss_ratio: float, capital: float) -> Dict[str, float]:
+    """Kelly sizing memoized on its (confidence, win/loss ratio, capital) inputs."""
+    return _strategies().calculate_kelly_position(
+        total_capital=capital,
+        ai_confidence=confidence,
+        win_loss_ratio=win_loss_ratio,
+    )
 
-        # Filter and sort
-        candidates = [s for s in symbol_stats if s["count"] >= MIN_SAMPLES]
-        if candidates:
-            top_by_avg = sorted(
-                candidates,
-                key=lambda x: x["avg_return_3d"],
-                reverse=True,
-            )[:3]
 
-            for row in top_by_avg:
-                arrow = "🟢" if row["avg_return_3d"] > 0 else "🔴"
-                st.markdown(
-                    f"- {arrow} `{row['symbol']}` · "
-                    f"avg 3D: **{row['avg_return_3d']:.1%}** · "
-                    f"n={int(row['count'])}"
-                )
-        else:
-            st.caption("No symbols with enough samples yet.")
+def _apply_kelly_sizes(orders: List[OrderInstruction], notional: float) -> List[OrderInstruction]:
+    """Return copies of the orders resized to the Kelly notional (UI only, router orders untouched)."""
+    sized = []
+    for order in orders:
+        price = float(order.price)
+        if price > 0:
+            order = replace(order, size=round(notional / price, 2))
+        sized.append(order)
+    return sized
+
+
+def _orders_frame(orders: List[OrderInstruction], decision: Dict[str, Any]) -> pd.DataFrame:
+    """One row per routed order; router meta overrides the AI PM's strategy/risk labels."""
+    rows = []
+    for i, order in enumerate(orders, start=1):
+        meta = order.meta or {}
+        rows.append({
+            "#": i,
+            "Side": order.side,
+            "Size": round(order.size, 2),
+            "Price": round(order.price, 2),
+            "Strategy": meta.get("routing_mode", decision["chosen_strategy"]),
+            "Risk": meta.get("ai_risk_mode", decision["risk_mode"]),
+        })
+    return pd.DataFrame(rows)
+
+
+@st.cache_data(show_spinner=False)
+def _run_replay_pipeline(
+    case_id: str,
+    pattern_key: Tuple[Any, ...],
+    _pattern: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Run AI PM decision, Kelly sizing and (if the edge is tradeable) the router for a historical case.
 
-    # Right column: Top symbols by sample count
-    with col_right:
-        st.markdown("**📊 Most frequent symbols**")
+    Memoized on (case_id, pattern_key); `_pattern` is left out of the cache key
+    (leading underscore) since pattern_key already identifies it.
+    """
+    market_state = build_demo_market_state(_select_cases((case_id,))[0], _pattern)
 
-        if symbol_stats:
-            top_by_count = sorted(
-                symbol_stats,
-                key=lambda x: x["count"],
-                reverse=True,
-            )[:3]
+    # Reset AI PM state for clean decision
+    S = _strategies()
+    S.reset_state()
+    decision = S.decide_strategy(market_state)
 
-            for row in top_by_count:
-                st.markdown(
-                    f"- `{row['symbol']}` · samples: **{int(row['count'])}** · "
-                    f"avg 3D: {row['avg_return_3d']:.1%}"
-                )
-        else:
-            st.caption("No historical cases loaded.")
+    # Determine win/loss ratio based on strategy
+    win_loss_ratio = 2.0 if decision["chosen_strategy"] == "sniper" else 1.2
+    kelly = _kelly(decision.get("confidence", 0.5), win_loss_ratio, BASE_CAPITAL)
+    kelly_rejects_trade = kelly["fraction_applied"] < MIN_FRACTION
 
-    st.caption(
-        "This radar summarizes which symbols have the strongest average 3D moves "
-        "and which have the most historical samples in the dataset."
+    # Edge too weak: no trade, so the router is never consulted
+    if kelly_rejects_trade:
+        orders = []
+    else:
+        orders = _apply_kelly_sizes(_route_tick(market_state), kelly["notional"])
+
+    return {
+        "decision": decision,
+        "orders": orders,
+        "kelly": kelly,
+        "kelly_rejects_trade": kelly_rejects_trade,
+    }
+
+
+# =============================================================================
+# Tabs
+# =============================================================================
+# Each tab is a fragment: widget changes inside one tab rerun only that tab,
+# not the whole script (e.g. typing a custom headline leaves the replay tab alone).
+
+@st.fragment
+def _replay_tab(cases_by_symbol: Dict[str, List[NewsCase]], symbols: List[str]) -> None:
+    """Historical Replay tab: pick a past event and show the AI PM's reaction."""
+    st.markdown("---")
+
+    # Symbol Selection
+    default_idx = symbols.index("BLUE") if "BLUE" in symbols else 0
+    symbol = st.selectbox("Symbol", symbols, index=default_idx, key="replay_symbol")
+
+    # Filter cases for selected symbol
+    symbol_cases = cases_by_symbol.get(symbol, [])
+    if not symbol_cases:
+        st.error(f"No cases found for {symbol}")
+        return
+
+    # Event Selection
+    case_options = _case_option_labels(symbol, _case_ids(symbol_cases))
+    selected_idx = st.selectbox(
+        "Historical event",
+        list(range(len(symbol_cases))),
+        format_func=lambda i: case_options[i],
+        index=len(symbol_cases) - 1,  # Default to latest
+        key="replay_event",
     )
+    selected_case = symbol_cases[selected_idx]
+
+    # ========== Main Area: News Card + Stats ==========
+    st.markdown("---")
+
+    col_news, col_stats = st.columns([1.2, 1.0])
+
+    # Left: News Event Card
+    with col_news:
+        st.subheader("📰 News Event")
+
+        # One markdown block per card: each st.markdown call is a separate frontend delta
+        st.markdown("\n\n".join([
+            f"**Symbol:** `{selected_case.symbol}`",
+            f"**Event date:** {selected_case.event_date}",
+            f"**Regime:** `{selected_case.regime}` · "
+            f"**Tag:** `{selected_case.source_tag}`",
+            "---",
+            f"**Headline**  \n{selected_case.news_headline}",
+            f"**Summary**  \n{selected_case.news_summary}",
+            # Show returns inline
+            f"**Returns:** 1D: {format_pct(selected_case.return_1d)} · "
+            f"3D: {format_pct(selected_case.return_3d)} · "
+            f"7D: {format_pct(selected_case.return_7d)}",
+        ]))
+
+    # Right: Historical Performance & Pattern
+    with col_stats:
+        st.subheader("📊 Historical Performance")
+
+        summary = _summarize(_case_ids(symbol_cases))
+
+        st.markdown("\n".join([
+            f"- Sample count: **{summary['count']}**",
+            f"- Avg 1D return: **{format_pct(summary['avg_return_1d'])}** "
+            f"(positive ratio: {summary['pos_ratio_1d']:.0%})",
+            f"- Avg 3D return: **{format_pct(summary['avg_return_3d'])}** "
+            f"(positive ratio: {summary['pos_ratio_3d']:.0%})",
+            f"- Avg 7D return: **{format_pct(summary['avg_return_7d'])}** "
+            f"(positive ratio: {summary['pos_ratio_7d']:.0%})",
+            "",
+            "---",
+            "#### 🧬 Pattern Analysis",
+        ]))
+
+        # Analyze pattern with LLM (or fallback to rule-based)
+        try:
+            pattern = _cached_pattern(symbol, _case_ids(symbol_cases), False)
+        except Exception as e:
+            st.warning(f"⚠️ Pattern analysis error: {repr(e)[:80]}")
+            pattern = {
+                "pattern_name": "unknown",
+                "avg_return_3d": summary.get("avg_return_3d", 0),
+                "confidence": 0.5,
+                "confidence_level": "low",
+                "typical_horizon": "3d",
+                "analysis_method": "rule_based",
+                "note": "Fallback due to error",
+            }
+
+        st.markdown("\n\n".join([
+            f"**Pattern name:** {pattern.get('pattern_name', 'N/A')}",
+            f"**Avg return (3D):** {format_pct(pattern.get('avg_return_3d', 0))} · "
+            f"**Confidence:** {pattern.get('confidence_level', pattern.get('confidence', 'low'))}",
+            f"**Typical horizon:** {pattern.get('typical_horizon', 'n/a')}",
+        ]))
+
+        # Show note/status
+        note = pattern.get('note')
+        if note:
+            if "not enabled" in note.lower():
+                st.info(f"ℹ️ {note}")
+            elif "error" in note.lower() or "fallback" in note.lower():
+                st.warning(f"⚠️ {note}")
+            else:
+                st.success(f"✅ {note}")
+
+        analysis_method = pattern.get('analysis_method')
+        if analysis_method:
+            st.caption(f"Analysis method: `{analysis_method}`")
+
+    # ========== AI PM Decision & Routed Orders ==========
+    st.markdown("---")
+    st.subheader("🤖 AI PM Decision & Routed Orders")
+
+    # Decision -> router orders -> Kelly, memoized on the case and the whole pattern:
+    # the market state embeds every pattern field (regime pick, AI PM inputs)
+    pattern_key = tuple(sorted(pattern.items()))
+    try:
+        pipeline = _run_replay_pipeline(selected_case.case_id, pattern_key, pattern)
+    except Exception as e:
+        st.error(f"❌ AI PM pipeline error: {repr(e)[:80]}")
+        return
 
-    # ========== Tabs ==========
-    tab_replay, tab_custom = st.tabs(["📜 Historical Replay", "🧪 Custom News Lab"])
+    decision = pipeline["decision"]
+    orders = pipeline["orders"]
+    kelly = pipeline["kelly"]
+    kelly_rejects_trade = pipeline["kelly_rejects_trade"]
 
-    # ========== TAB 1: Historical Replay ==========
-    with tab_replay:
-        st.markdown("---")
+    if kelly_rejects_trade:
+        # Edge too weak - suggest no trade
+        st.warning(
+            f"⚠️ Kelly-adjusted fraction is very small ({kelly['fraction_applied']:.3f}). "
+            "Suggested action: **no trade** (edge not strong enough)."
+        )
 
-        # Symbol Selection
-        default_idx = symbols.index("BLUE") if "BLUE" in symbols else 0
-        symbol = st.selectbox("Symbol", symbols, index=default_idx, key="replay_symbol")
-
-        # Filter cases for selected symbol
-        symbol_cases = filter_cases(cases, symbol=symbol)
-        if not symbol_cases:
-            st.error(f"No cases found for {symbol}")
-            return
-
-        # Event Selection
-        def _format_case_option(c):
-            # Assuming NewsCase has case_id field; if not, use index
-            cid = getattr(c, "case_id", "?")
-            title = c.news_headline[:40] + "..." if len(c.news_headline) > 40 else c.news_headline
-            return f"{cid} · {c.event_date} · {title}"
-
-        case_options = [_format_case_option(c) for c in symbol_cases]
-        selected_idx = st.selectbox(
-            "Historical event",
-            list(range(len(symbol_cases))),
-            format_func=lambda i: case_options[i],
-            index=len(symbol_cases) - 1,  # Default to latest
-            key="replay_event",
+    col_decision, col_orders = st.columns([1.0, 1.2])
+
+    # Left: AI PM Decision
+    with col_decision:
+        st.markdown("\n\n".join([
+            "##### 🎯 AI PM Decision",
+            f"**Chosen strategy:** `{decision['chosen_strategy']}`",
+            f"**Risk mode:** `{decision['risk_mode']}`",
+            f"**Confidence:** {decision['confidence']:.2f}",
+            "**Reasoning**",
+        ]))
+        # Use a styled code block for better readability
+        st.markdown(
+            f"""<div style='background-color:#1e1e1e;
+                          padding:0.75rem;
+                          border-radius:0.5rem;
+                          font-size:0.9rem;
+                          font-family:monospace;'>
+                {decision['reason']}
+            </div>""",
+            unsafe_allow_html=True,
         )
-        selected_case = symbol_cases[selected_idx]
 
-        # ========== Main Area: News Card + Stats ==========
-        st.markdown("---")
+        # Kelly-style Position Sizing (Demo Display Only)
+        st.markdown("\n".join([
+            "##### 📐 Position Sizing (Kelly-style, demo)",
+            "",
+            f"- Base capital: **${BASE_CAPITAL:,.2f}**",
+            f"- Raw Kelly fraction: **{kelly['fraction_raw']:.3f}**  "
+            f"(full Kelly, theoretical)",
+            f"- Half Kelly: **{kelly['fraction_half']:.3f}**  "
+            f"(more realistic)",
+            f"- Applied fraction: **{kelly['fraction_applied']:.3f}**  "
+            f"(capped at 20%)",
+            f"- Suggested notional: **${kelly['notional']:,.2f}**",
+        ]))
 
-        col_news, col_stats = st.columns([1.2, 1.0])
+        if kelly_rejects_trade:
+            st.caption(
+                f"Note: Kelly suggests that the edge is too weak (<{MIN_FRACTION:.0%} of capital). "
+                "In this demo, the PM chooses to stay out and not place any orders."
+            )
+        else:
+            st.caption(
+                "Note: In this web demo, order sizes shown on the right use this Kelly-adjusted notional "
+                "(half Kelly, capped at 20% of capital)."
+            )
 
-        # Left: News Event Card
-        with col_news:
-            st.subheader("📰 News Event")
+    # Right: Routed Orders
+    with col_orders:
+        st.markdown("##### 📦 Routed Orders")
+        if not orders:
+            if kelly_rejects_trade:
+                st.info("ℹ️ No orders – Kelly suggests standing aside for this setup (edge too weak).")
+            else:
+                st.info("ℹ️ No orders generated for this scenario.")
+        else:
+            st.dataframe(_orders_frame(orders, decision), hide_index=True)
 
-            st.markdown(f"**Symbol:** `{selected_case.symbol}`")
-            st.markdown(f"**Event date:** {selected_case.event_date}")
-            st.markdown(
-                f"**Regime:** `{selected_case.regime}` · "
-                f"**Tag:** `{selected_case.source_tag}`"
-            )
+    # Summary explanation
+    st.markdown("---")
+    st.markdown("### 💡 Summary")
 
-            st.markdown("---")
+    strategy_name = decision.get("chosen_strategy", "unknown")
+    risk_mode = decision.get("risk_mode", "normal")
+    avg_3d = pattern.get("avg_return_3d", 0) or 0
+
+    if avg_3d > 0.10:
+        pattern_desc = "strong positive 3D returns"
+    elif avg_3d < -0.05:
+        pattern_desc = "negative 3D returns"
+    else:
+        pattern_desc = "mixed or neutral 3D returns"
+
+    analysis_status = (
+        "attempted to use LLM for enhanced analysis but fell back to rule-based mode"
+        if "fallback" in pattern.get("note", "").lower() or "error" in pattern.get("note", "").lower()
+        else "used LLM for pattern analysis"
+        if pattern.get("analysis_method") == "llm"
+        else "used rule-based analysis"
+    )
 
-            st.markdown(f"**Headline**  \n{selected_case.news_headline}")
-            st.markdown(f"**Summary**  \n{selected_case.news_summary}")
+    st.info(
+        f"In this scenario, the AI PM chose **{strategy_name.upper()}** with "
+        f"**{risk_mode.upper()}** risk mode because the historical pattern shows "
+        f"**{pattern_desc}** ({format_pct(avg_3d)} average). "
+        f"The system {analysis_status}."
+    )
 
-            # Show returns inline
-            st.markdown(
-                f"**Returns:** 1D: {format_pct(selected_case.return_1d)} · "
-                f"3D: {format_pct(selected_case.return_3d)} · "
-                f"7D: {format_pct(selected_case.return_7d)}"
-            )
 
-        # Right: Historical Performance & Pattern
-        with col_stats:
-            st.subheader("📊 Historical Performance")
+@st.fragment
+def _custom_tab(cases_by_symbol: Dict[str, List[NewsCase]], symbols: List[str]) -> None:
+    """Custom News Lab tab: score a hypothetical headline against symbol history."""
+    _rerun_when_llm_lands(_render_custom_tab(cases_by_symbol, symbols))
 
-            summary = summarize_cases(symbol_cases)
 
-            st.markdown(f"- Sample count: **{summary['count']}**")
-            st.markdown(
-                f"- Avg 1D return: **{format_pct(summary['avg_return_1d'])}** "
-                f"(positive ratio: {summary['pos_ratio_1d']:.0%})"
-            )
-            st.markdown(
+def _render_custom_tab(
+    cases_by_symbol: Dict[str, List[NewsCase]], symbols: List[str]
+) -> Optional[Tuple[Any, ...]]:
+    """Render the tab; returns the pattern key it shows (None without historical cases)."""
+    st.subheader("🧪 Custom News Lab")
+    st.markdown(
+        "Type a hypothetical headline and let the AI PM react based on historical patterns "
+        "for the selected symbol."
+    )
+    st.markdown("---")
+
+    col_inputs, col_stats = st.columns([1.2, 1.0])
+
+    # Left: Inputs
+    with col_inputs:
+        # Symbol selection
+        default_idx = symbols.index("BLUE") if "BLUE" in symbols else 0
+        custom_symbol = st.selectbox("Symbol", symbols, index=default_idx, key="custom_symbol")
+
+        # Event type selection
+        event_type = st.selectbox(
+            "Event type / pattern",
+            [
+                "Auto detect from symbol history",
+                "Positive macro / ETF news",
+                "Negative regulation / FUD",
+                "Company earnings beat",
+                "Security incident / exploit",
+            ],
+            index=0,
+        )
+
+        # Custom headline and summary
+        custom_headline = st.text_input("Custom headline", "")
+        custom_summary = st.text_area("Custom summary (optional)", "")
+
+    # Filter cases by symbol
+    custom_symbol_cases = cases_by_symbol.get(custom_symbol, [])
+
+    # Optionally filter by event type (simple tag-based filtering)
+    filtered_cases = custom_symbol_cases
+    wanted_kinds = _EVENT_TYPE_TAG_KINDS.get(event_type)
+    if wanted_kinds and custom_symbol_cases:
+        tag_kinds = _tag_kinds()
+        tag_filtered = [c for c in custom_symbol_cases if tag_kinds[c.case_id] & wanted_kinds]
+        if tag_filtered:
+            filtered_cases = tag_filtered
+
+    # Right: Stats and Pattern
+    pattern_key = None
+    with col_stats:
+        st.markdown("#### 📊 Historical Pattern for This Symbol")
+
+        if not filtered_cases:
+            st.warning(f"No historical cases found for {custom_symbol}")
+        else:
+            summary = _summarize(_case_ids(filtered_cases))
+
+            st.markdown("\n".join([
+                f"- Sample count: **{summary['count']}**",
                 f"- Avg 3D return: **{format_pct(summary['avg_return_3d'])}** "
-                f"(positive ratio: {summary['pos_ratio_3d']:.0%})"
-            )
-            st.markdown(
+                f"(positive ratio: {summary['pos_ratio_3d']:.0%})",
                 f"- Avg 7D return: **{format_pct(summary['avg_return_7d'])}** "
-                f"(positive ratio: {summary['pos_ratio_7d']:.0%})"
-            )
+                f"(positive ratio: {summary['pos_ratio_7d']:.0%})",
+                "",
+                "---",
+            ]))
 
-            st.markdown("---")
-            st.markdown("#### 🧬 Pattern Analysis")
+            # Add Gemini button for deeper analysis
+            ask_gemini = st.button("🔍 Ask Gemini for deeper analysis", key="custom_ask_gemini")
+
+            pattern_key = (custom_symbol, _case_ids(filtered_cases))
+            if ask_gemini and _USE_LLM:
+                _submit_llm_pattern(pattern_key, filtered_cases)
+            llm_future = st.session_state.get("pending_patterns", {}).get(pattern_key)
 
-            # Analyze pattern with LLM (or fallback to rule-based)
+            # Analyze pattern (rule-based until the Gemini result lands)
             try:
-                pattern = analyze_pattern_with_llm(symbol_cases, force_llm=False)
+                if llm_future is not None and llm_future.done():
+                    custom_pattern = llm_future.result()
+                else:
+                    custom_pattern = _cached_pattern(
+                        custom_symbol, pattern_key[1], ask_gemini and not _USE_LLM
+                    )
             except Exception as e:
-                st.warning(f"⚠️ Pattern analysis error: {repr(e)[:80]}")
-                pattern = {
+                st.caption(f"⚠️ Pattern analysis error: {repr(e)[:60]}")
+                custom_pattern = {
                     "pattern_name": "unknown",
                     "avg_return_3d": summary.get("avg_return_3d", 0),
                     "confidence": 0.5,
@@ -325,436 +745,221 @@ def main():
                     "note": "Fallback due to error",
                 }
 
-            st.markdown(f"**Pattern name:** {pattern.get('pattern_name', 'N/A')}")
-            st.markdown(
-                f"**Avg return (3D):** {format_pct(pattern.get('avg_return_3d', 0))} · "
-                f"**Confidence:** {pattern.get('confidence_level', pattern.get('confidence', 'low'))}"
-            )
-            st.markdown(f"**Typical horizon:** {pattern.get('typical_horizon', 'n/a')}")
-
-            # Show note/status
-            note = pattern.get('note')
-            if note:
-                if "not enabled" in note.lower():
-                    st.info(f"ℹ️ {note}")
-                elif "error" in note.lower() or "fallback" in note.lower():
-                    st.warning(f"⚠️ {note}")
-                else:
-                    st.success(f"✅ {note}")
-
-            analysis_method = pattern.get('analysis_method')
-            if analysis_method:
-                st.caption(f"Analysis method: `{analysis_method}`")
-
-        # ========== AI PM Decision & Routed Orders ==========
-        st.markdown("---")
-        st.subheader("🤖 AI PM Decision & Routed Orders")
-
-        # Build market state
-        market_state = build_demo_market_state(selected_case, pattern)
+            st.markdown("\n\n".join([
+                f"**Pattern:** {custom_pattern.get('pattern_name', 'N/A')}",
+                f"**Avg return (3D):** {format_pct(custom_pattern.get('avg_return_3d', 0))} · "
+                f"**Confidence:** {custom_pattern.get('confidence_level', 'low')}",
+            ]))
 
-        # Reset AI PM state for clean decision
-        reset_state()
+            if llm_future is not None and not llm_future.done():
+                st.info("⏳ Gemini analysis running in the background; showing rule-based pattern meanwhile.")
 
-        # Get AI PM decision
-        try:
-            decision = decide_strategy(market_state)
-        except Exception as e:
-            st.error(f"❌ AI PM decision error: {repr(e)[:80]}")
-            return
+            # Show analysis method and note
+            analysis_method = custom_pattern.get('analysis_method', 'unknown')
+            note = custom_pattern.get('note')
 
-        # Get router orders
-        try:
-            router = StrategyRouter(verbose=False)
-            orders = router.on_tick(market_state)
-        except Exception as e:
-            st.error(f"❌ Router error: {repr(e)[:80]}")
-            return
+            if analysis_method == "llm":
+                st.success(f"✅ {note}")
+            elif analysis_method == "rule_based_fallback":
+                st.warning(f"⚠️ {note}")
+            elif note:
+                st.info(f"ℹ️ {note}")
 
-        # === Kelly-based sizing for UI demo only ===
-        BASE_CAPITAL = 10_000.0  # Demo account with $10k
-        MIN_FRACTION = 0.02  # Minimum edge threshold (2%)
+            st.caption(f"Analysis method: `{analysis_method}`")
 
-        # Determine win/loss ratio based on strategy
-        win_loss_ratio = 2.0 if decision["chosen_strategy"] == "sniper" else 1.2
+    # Show AI PM decision only if headline is provided
+    if not custom_headline.strip():
+        st.markdown("---")
+        st.info("💡 Enter a headline above to see how the AI PM would react.")
+    else:
+        if not filtered_cases:
+            st.error("Cannot generate decision without historical data for this symbol.")
+        else:
+            st.markdown("---")
+            st.subheader("🤖 AI PM Decision for This Custom Event")
+
+            # Build custom market state
+            reference_case = filtered_cases[-1]
+            custom_market_state = build_custom_market_state(
+                custom_symbol,
+                custom_pattern,
+                custom_headline,
+                custom_summary,
+                reference_case,
+            )
 
-        # Calculate Kelly position with all details
-        kelly = calculate_kelly_position(
-            total_capital=BASE_CAPITAL,
-            ai_confidence=decision.get("confidence", 0.5),
-            win_loss_ratio=win_loss_ratio,
-        )
+            # Reset AI PM state
+            S = _strategies()
+            S.reset_state()
 
-        # Check if edge is strong enough to trade
-        kelly_rejects_trade = kelly["fraction_applied"] < MIN_FRACTION
+            # Get AI PM decision
+            try:
+                custom_decision = S.decide_strategy(custom_market_state)
+            except Exception as e:
+                st.error(f"❌ AI PM decision error: {repr(e)[:80]}")
+                return pattern_key
 
-        if kelly_rejects_trade:
-            # Edge too weak - suggest no trade
-            st.warning(
-                f"⚠️ Kelly-adjusted fraction is very small ({kelly['fraction_applied']:.3f}). "
-                "Suggested action: **no trade** (edge not strong enough)."
-            )
-            orders = []
-        else:
-            # Apply Kelly sizing to orders (UI only, doesn't affect router logic)
-            for order in orders:
-                price = float(order.price)
-                if price > 0:
-                    kelly_size = kelly["notional"] / price
-                    order.size = round(kelly_size, 2)
-
-        col_decision, col_orders = st.columns([1.0, 1.2])
-
-        # Left: AI PM Decision
-        with col_decision:
-            st.markdown("##### 🎯 AI PM Decision")
-            st.markdown(f"**Chosen strategy:** `{decision['chosen_strategy']}`")
-            st.markdown(f"**Risk mode:** `{decision['risk_mode']}`")
-            st.markdown(f"**Confidence:** {decision['confidence']:.2f}")
-
-            st.markdown("**Reasoning**")
-            # Use a styled code block for better readability
-            st.markdown(
-                f"""<div style='background-color:#1e1e1e;
-                              padding:0.75rem;
-                              border-radius:0.5rem;
-                              font-size:0.9rem;
-                              font-family:monospace;'>
-                    {decision['reason']}
-                </div>""",
-                unsafe_allow_html=True,
-            )
+            # Kelly sizing (before routing, so a rejected edge skips the router)
+            win_loss_ratio = 2.0 if custom_decision["chosen_strategy"] == "sniper" else 1.2
 
-            # Kelly-style Position Sizing (Demo Display Only)
-            st.markdown("##### 📐 Position Sizing (Kelly-style, demo)")
+            custom_kelly = _kelly(custom_decision.get("confidence", 0.5), win_loss_ratio, BASE_CAPITAL)
 
-            st.markdown(f"- Base capital: **${BASE_CAPITAL:,.2f}**")
-            st.markdown(
-                f"- Raw Kelly fraction: **{kelly['fraction_raw']:.3f}**  "
-                f"(full Kelly, theoretical)"
-            )
-            st.markdown(
-                f"- Half Kelly: **{kelly['fraction_half']:.3f}**  "
-                f"(more realistic)"
-            )
-            st.markdown(
-                f"- Applied fraction: **{kelly['fraction_applied']:.3f}**  "
-                f"(capped at 20%)"
-            )
-            st.markdown(
-                f"- Suggested notional: **${kelly['notional']:,.2f}**"
-            )
+            kelly_rejects_trade = custom_kelly["fraction_applied"] < MIN_FRACTION
 
             if kelly_rejects_trade:
-                st.caption(
-                    f"Note: Kelly suggests that the edge is too weak (<{MIN_FRACTION:.0%} of capital). "
-                    "In this demo, the PM chooses to stay out and not place any orders."
+                st.warning(
+                    f"⚠️ Kelly-adjusted fraction is very small ({custom_kelly['fraction_applied']:.3f}). "
+                    "Suggested action: **no trade** (edge not strong enough)."
                 )
+                custom_orders = []
             else:
-                st.caption(
-                    "Note: In this web demo, order sizes shown on the right use this Kelly-adjusted notional "
-                    "(half Kelly, capped at 20% of capital)."
+                # Get router orders
+                try:
+                    custom_orders = _route_tick(custom_market_state)
+                except Exception as e:
+                    st.error(f"❌ Router error: {repr(e)[:80]}")
+                    return pattern_key
+                custom_orders = _apply_kelly_sizes(custom_orders, custom_kelly["notional"])
+
+            col_decision, col_orders = st.columns([1.0, 1.2])
+
+            # Left: Decision
+            with col_decision:
+                st.markdown("\n\n".join([
+                    "##### 🎯 AI PM Decision",
+                    f"**Chosen strategy:** `{custom_decision['chosen_strategy']}`",
+                    f"**Risk mode:** `{custom_decision['risk_mode']}`",
+                    f"**Confidence:** {custom_decision['confidence']:.2f}",
+                    "**Reasoning**",
+                ]))
+                st.markdown(
+                    f"""<div style='background-color:#1e1e1e;
+                                  padding:0.75rem;
+                                  border-radius:0.5rem;
+                                  font-size:0.9rem;
+                                  font-family:monospace;'>
+                        {custom_decision['reason']}
+                    </div>""",
+                    unsafe_allow_html=True,
                 )
 
-        # Right: Routed Orders
-        with col_orders:
-            st.markdown("##### 📦 Routed Orders")
-            if not orders:
+                # Kelly sizing
+                st.markdown("\n".join([
+                    "##### 📐 Position Sizing (Kelly-style, demo)",
+                    "",
+                    f"- Base capital: **${BASE_CAPITAL:,.2f}**",
+                    f"- Applied fraction: **{custom_kelly['fraction_applied']:.3f}**",
+                    f"- Suggested notional: **${custom_kelly['notional']:,.2f}**",
+                ]))
+
                 if kelly_rejects_trade:
-                    st.info("ℹ️ No orders – Kelly suggests standing aside for this setup (edge too weak).")
-                else:
-                    st.info("ℹ️ No orders generated for this scenario.")
-            else:
-                for i, order in enumerate(orders, start=1):
-                    # Extract order details
-                    side = order.side
-                    size = order.size
-                    price = order.price
-
-                    # Extract metadata
-                    strategy_name = decision["chosen_strategy"]
-                    risk = decision["risk_mode"]
-                    if hasattr(order, 'meta') and order.meta:
-                        strategy_name = order.meta.get("routing_mode", strategy_name)
-                        risk = order.meta.get("ai_risk_mode", risk)
-
-                    st.markdown(
-                        f"**Order {i}**  \n"
-                        f"- Side: `{side}`  \n"
-                        f"- Size: `{size:.2f}`  \n"
-                        f"- Price: `{price:.2f}`  \n"
-                        f"- Strategy: `{strategy_name}`  \n"
-                        f"- Risk: `{risk}`"
+                    st.caption(
+                        f"Note: Kelly suggests edge is too weak (<{MIN_FRACTION:.0%}). No trade recommended."
                     )
-                    if i < len(orders):
-                        st.markdown("---")
 
-        # Summary explanation
-        st.markdown("---")
-        st.markdown("### 💡 Summary")
+            # Right: Orders
+            with col_orders:
+                st.markdown("##### 📦 Routed Orders")
+                if not custom_orders:
+                    if kelly_rejects_trade:
+                        st.info("ℹ️ No orders – Kelly suggests standing aside (edge too weak).")
+                    else:
+                        st.info("ℹ️ No orders generated for this scenario.")
+                else:
+                    st.dataframe(_orders_frame(custom_orders, custom_decision), hide_index=True)
 
-        strategy_name = decision.get("chosen_strategy", "unknown")
-        risk_mode = decision.get("risk_mode", "normal")
-        avg_3d = pattern.get("avg_return_3d", 0) or 0
+    return pattern_key
 
-        if avg_3d > 0.10:
-            pattern_desc = "strong positive 3D returns"
-        elif avg_3d < -0.05:
-            pattern_desc = "negative 3D returns"
-        else:
-            pattern_desc = "mixed or neutral 3D returns"
-
-        analysis_status = (
-            "attempted to use LLM for enhanced analysis but fell back to rule-based mode"
-            if "fallback" in pattern.get("note", "").lower() or "error" in pattern.get("note", "").lower()
-            else "used LLM for pattern analysis"
-            if pattern.get("analysis_method") == "llm"
-            else "used rule-based analysis"
-        )
 
-        st.info(
-            f"In this scenario, the AI PM chose **{strategy_name.upper()}** with "
-            f"**{risk_mode.upper()}** risk mode because the historical pattern shows "
-            f"**{pattern_desc}** ({format_pct(avg_3d)} average). "
-            f"The system {analysis_status}."
-        )
+# =============================================================================
+# Main App
+# =============================================================================
 
-    # ========== TAB 2: Custom News Lab ==========
-    with tab_custom:
-        st.subheader("🧪 Custom News Lab")
-        st.markdown(
-            "Type a hypothetical headline and let the AI PM react based on historical patterns "
-            "for the selected symbol."
-        )
-        st.markdown("---")
+def main():
+    st.set_page_config(
+        page_title="News-Driven AI PM",
+        layout="wide",
+        initial_sidebar_state="expanded",
+    )
 
-        col_inputs, col_stats = st.columns([1.2, 1.0])
-
-        # Left: Inputs
-        with col_inputs:
-            # Symbol selection
-            default_idx = symbols.index("BLUE") if "BLUE" in symbols else 0
-            custom_symbol = st.selectbox("Symbol", symbols, index=default_idx, key="custom_symbol")
-
-            # Event type selection
-            event_type = st.selectbox(
-                "Event type / pattern",
-                [
-                    "Auto detect from symbol history",
-                    "Positive macro / ETF news",
-                    "Negative regulation / FUD",
-                    "Company earnings beat",
-                    "Security incident / exploit",
-                ],
-                index=0,
-            )
+    # ========== Top: Title + Intro ==========
+    st.title("🧠 News-Driven AI Portfolio Manager")
+    st.markdown(
+        "An AI portfolio manager that reads news, learns from historical price reactions, "
+        "and routes capital across arbitrage and sniper strategies."
+    )
 
-            # Custom headline and summary
-            custom_headline = st.text_input("Custom headline", "")
-            custom_summary = st.text_area("Custom summary (optional)", "")
-
-        # Filter cases by symbol
-        custom_symbol_cases = filter_cases(cases, symbol=custom_symbol)
-
-        # Optionally filter by event type
-        filtered_cases = custom_symbol_cases
-        if event_type != "Auto detect from symbol history" and custom_symbol_cases:
-            # Simple tag-based filtering
-            if "Positive" in event_type:
-                tag_filtered = [c for c in custom_symbol_cases if "利好" in c.source_tag or "positive" in c.source_tag.lower()]
-                if tag_filtered:
-                    filtered_cases = tag_filtered
-            elif "Negative" in event_type or "FUD" in event_type:
-                tag_filtered = [c for c in custom_symbol_cases if "利空" in c.source_tag or "negative" in c.source_tag.lower() or "fud" in c.source_tag.lower()]
-                if tag_filtered:
-                    filtered_cases = tag_filtered
-
-        # Right: Stats and Pattern
-        with col_stats:
-            st.markdown("#### 📊 Historical Pattern for This Symbol")
-
-            if not filtered_cases:
-                st.warning(f"No historical cases found for {custom_symbol}")
-            else:
-                summary = summarize_cases(filtered_cases)
+    # ========== Load Data ==========
+    cases = _load_cases()
+    if not cases:
+        st.error("❌ No news cases loaded. Please check data/news_cases.csv.")
+        return
 
-                st.markdown(f"- Sample count: **{summary['count']}**")
-                st.markdown(
-                    f"- Avg 3D return: **{format_pct(summary['avg_return_3d'])}** "
-                    f"(positive ratio: {summary['pos_ratio_3d']:.0%})"
-                )
-                st.markdown(
-                    f"- Avg 7D return: **{format_pct(summary['avg_return_7d'])}** "
-                    f"(positive ratio: {summary['pos_ratio_7d']:.0%})"
-                )
+    cases_by_symbol = _cases_by_symbol()
+    symbols = sorted(cases_by_symbol)
+    top_by_avg, top_by_count = _radar_top()
 
-                st.markdown("---")
+    # ========== Sidebar: LLM Status ==========
+    st.sidebar.header("⚙️ System Status")
 
-                # Add Gemini button for deeper analysis
-                ask_gemini = st.button("🔍 Ask Gemini for deeper analysis", key="custom_ask_gemini")
+    # LLM Status
+    use_llm = _USE_LLM
+    has_key = bool(os.environ.get("GEMINI_API_KEY"))
+    st.sidebar.info(f"""
+**LLM Mode:** {"ON" if use_llm else "OFF"}
+**API Key:** {"[set]" if has_key else "[not set]"}
 
-                # Analyze pattern
-                try:
-                    custom_pattern = analyze_pattern_with_llm(filtered_cases, force_llm=ask_gemini)
-                except Exception as e:
-                    st.caption(f"⚠️ Pattern analysis error: {repr(e)[:60]}")
-                    custom_pattern = {
-                        "pattern_name": "unknown",
-                        "avg_return_3d": summary.get("avg_return_3d", 0),
-                        "confidence": 0.5,
-                        "confidence_level": "low",
-                        "typical_horizon": "3d",
-                        "analysis_method": "rule_based",
-                        "note": "Fallback due to error",
-                    }
-
-                st.markdown(f"**Pattern:** {custom_pattern.get('pattern_name', 'N/A')}")
-                st.markdown(
-                    f"**Avg return (3D):** {format_pct(custom_pattern.get('avg_return_3d', 0))} · "
-                    f"**Confidence:** {custom_pattern.get('confidence_level', 'low')}"
-                )
+*LLM mode is controlled via environment variables.*
+    """)
 
-                # Show analysis method and note
-                analysis_method = custom_pattern.get('analysis_method', 'unknown')
-                note = custom_pattern.get('note')
+    # ========== Top Opportunities Radar ==========
+    st.markdown("### 📡 Top Opportunities Radar")
 
-                if analysis_method == "llm":
-                    st.success(f"✅ {note}")
-                elif analysis_method == "rule_based_fallback":
-                    st.warning(f"⚠️ {note}")
-                elif note:
-                    st.info(f"ℹ️ {note}")
+    col_left, col_right = st.columns(2)
 
-                st.caption(f"Analysis method: `{analysis_method}`")
+    # Left column: Top symbols by avg_return_3d
+    with col_left:
+        st.markdown("**📈 Top avg 3D return**")
 
-        # Show AI PM decision only if headline is provided
-        if not custom_headline.strip():
-            st.markdown("---")
-            st.info("💡 Enter a headline above to see how the AI PM would react.")
-        else:
-            if not filtered_cases:
-                st.error("Cannot generate decision without historical data for this symbol.")
-            else:
-                st.markdown("---")
-                st.subheader("🤖 AI PM Decision for This Custom Event")
-
-                # Build custom market state
-                reference_case = filtered_cases[-1]
-                custom_market_state = build_custom_market_state(
-                    custom_symbol,
-                    custom_pattern,
-                    custom_headline,
-                    custom_summary,
-                    reference_case,
+        if top_by_avg:
+            for row in top_by_avg:
+                arrow = "🟢" if row["avg_return_3d"] > 0 else "🔴"
+                st.markdown(
+                    f"- {arrow} `{row['symbol']}` · "
+                    f"avg 3D: **{row['avg_return_3d']:.1%}** · "
+                    f"n={int(row['count'])}"
                 )
+        else:
+            st.caption("No symbols with enough samples yet.")
 
-                # Reset AI PM state
-                reset_state()
-
-                # Get AI PM decision
-                try:
-                    custom_decision = decide_strategy(custom_market_state)
-                except Exception as e:
-                    st.error(f"❌ AI PM decision error: {repr(e)[:80]}")
-                    return
-
-                # Get router orders
-                try:
-                    custom_router = StrategyRouter(verbose=False)
-                    custom_orders = custom_router.on_tick(custom_market_state)
-                except Exception as e:
-                    st.error(f"❌ Router error: {repr(e)[:80]}")
-                    return
-
-                # Kelly sizing
-                BASE_CAPITAL = 10_000.0
-                MIN_FRACTION = 0.02
-
-                win_loss_ratio = 2.0 if custom_decision["chosen_strategy"] == "sniper" else 1.2
+    # Right column: Top symbols by sample count
+    with col_right:
+        st.markdown("**📊 Most frequent symbols**")
 
-                custom_kelly = calculate_kelly_position(
-                    total_capital=BASE_CAPITAL,
-                    ai_confidence=custom_decision.get("confidence", 0.5),
-                    win_loss_ratio=win_loss_ratio,
+        if top_by_count:
+            for row in top_by_count:
+                st.markdown(
+                    f"- `{row['symbol']}` · samples: **{int(row['count'])}** · "
+                    f"avg 3D: {row['avg_return_3d']:.1%}"
                 )
+        else:
+            st.caption("No historical cases loaded.")
 
-                kelly_rejects_trade = custom_kelly["fraction_applied"] < MIN_FRACTION
+    st.caption(
+        "This radar summarizes which symbols have the strongest average 3D moves "
+        "and which have the most historical samples in the dataset."
+    )
 
-                if kelly_rejects_trade:
-                    st.warning(
-                        f"⚠️ Kelly-adjusted fraction is very small ({custom_kelly['fraction_applied']:.3f}). "
-                        "Suggested action: **no trade** (edge not strong enough)."
-                    )
-                    custom_orders = []
-                else:
-                    for order in custom_orders:
-                        price = float(order.price)
-                        if price > 0:
-                            kelly_size = custom_kelly["notional"] / price
-                            order.size = round(kelly_size, 2)
-
-                col_decision, col_orders = st.columns([1.0, 1.2])
-
-                # Left: Decision
-                with col_decision:
-                    st.markdown("##### 🎯 AI PM Decision")
-                    st.markdown(f"**Chosen strategy:** `{custom_decision['chosen_strategy']}`")
-                    st.markdown(f"**Risk mode:** `{custom_decision['risk_mode']}`")
-                    st.markdown(f"**Confidence:** {custom_decision['confidence']:.2f}")
-
-                    st.markdown("**Reasoning**")
-                    st.markdown(
-                        f"""<div style='background-color:#1e1e1e;
-                                      padding:0.75rem;
-                                      border-radius:0.5rem;
-                                      font-size:0.9rem;
-                                      font-family:monospace;'>
-                            {custom_decision['reason']}
-                        </div>""",
-                        unsafe_allow_html=True,
-                    )
+    # ========== Tabs ==========
+    tab_replay, tab_custom = st.tabs(["📜 Historical Replay", "🧪 Custom News Lab"])
 
-                    # Kelly sizing
-                    st.markdown("##### 📐 Position Sizing (Kelly-style, demo)")
-                    st.markdown(f"- Base capital: **${BASE_CAPITAL:,.2f}**")
-                    st.markdown(f"- Applied fraction: **{custom_kelly['fraction_applied']:.3f}**")
-                    st.markdown(f"- Suggested notional: **${custom_kelly['notional']:,.2f}**")
+    # ========== TAB 1: Historical Replay ==========
+    with tab_replay:
+        _replay_tab(cases_by_symbol, symbols)
 
-                    if kelly_rejects_trade:
-                        st.caption(
-                            f"Note: Kelly suggests edge is too weak (<{MIN_FRACTION:.0%}). No trade recommended."
-                        )
-
-                # Right: Orders
-                with col_orders:
-                    st.markdown("##### 📦 Routed Orders")
-                    if not custom_orders:
-                        if kelly_rejects_trade:
-                            st.info("ℹ️ No orders – Kelly suggests standing aside (edge too weak).")
-                        else:
-                            st.info("ℹ️ No orders generated for this scenario.")
-                    else:
-                        for i, order in enumerate(custom_orders, start=1):
-                            side = order.side
-                            size = order.size
-                            price = order.price
-
-                            strategy_name = custom_decision["chosen_strategy"]
-                            risk = custom_decision["risk_mode"]
-                            if hasattr(order, 'meta') and order.meta:
-                                strategy_name = order.meta.get("routing_mode", strategy_name)
-                                risk = order.meta.get("ai_risk_mode", risk)
-
-                            st.markdown(
-                                f"**Order {i}**  \n"
-                                f"- Side: `{side}`  \n"
-                                f"- Size: `{size:.2f}`  \n"
-                                f"- Price: `{price:.2f}`  \n"
-                                f"- Strategy: `{strategy_name}`  \n"
-                                f"- Risk: `{risk}`"
-                            )
-                            if i < len(custom_orders):
-                                st.markdown("---")
+    # ========== TAB 2: Custom News Lab ==========
+    with tab_custom:
+        _custom_tab(cases_by_symbol, symbols)
 
 
 if __name__ == "__main__":
@@ -12,18 +12,38 @@ strategies based on market conditions, with clear visibility into
 AI PM decisions.
 """
 
-from typing import Any, Dict, List, Optional
+from __future__ import annotations
 
-from strategies.base import BaseStrategy, OrderInstruction
-from strategies.ou_arb import OUArbStrategy
-from strategies.sniper import SniperStrategy
-from strategies.router import StrategyRouter
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+# The strategy stack (and the AI PM's optional LLM SDK behind it) is imported
+# on first use, so importing this module stays cheap.
+if TYPE_CHECKING:
+    from engine.backtest import BacktestEngine
+    from strategies.base import BaseStrategy, OrderInstruction
+    from strategies.ou_arb import OUArbStrategy
+    from strategies.sniper import SniperStrategy
+    from strategies.router import StrategyRouter
 
 
 # =============================================================================
 # HELPERS
 # =============================================================================
 
+# Separator lines, built once
+SEP_70 = "=" * 70
+SUB_70 = "─" * 70
+RULE_40 = "-" * 40
+PHASE_HEADER = f"\n{SUB_70}\n PHASE {{phase}}: {{name}}\n{SUB_70}"
+
+
+def section_header(title: str) -> str:
+    """Blank line, then the title between two '=' rules."""
+    return f"\n{SEP_70}\n {title}\n{SEP_70}"
+
+
 def describe_orders(orders: List[OrderInstruction], show_router_info: bool = False) -> str:
     """
     Format a list of OrderInstructions into a human-readable string.
@@ -91,94 +111,81 @@ def build_series() -> List[Dict[str, Any]]:
     """
     series = []
 
+    # Each phase is one template dict; ticks only add "tick" (and, in phase C,
+    # the falling ask), instead of rebuilding every field per tick.
+
     # ===== PHASE A: NEUTRAL (Ticks 0-2) =====
-    for i in range(3):
-        series.append({
-            "tick": i,
-            "phase": "A",
-            "phase_name": "neutral",
-            "mode": None,
-            # Arb: no spread
-            "pm_ask": 0.50,
-            "pm_bid": 0.49,
-            "op_ask": 0.51,
-            "op_bid": 0.50,
-            # Sniper: price too high (0.52 > 0.48 trigger)
-            "best_ask": 0.52,
-            "best_bid": 0.51,
-            "gas_cost_usd": 0.0,
-        })
+    neutral = {
+        "phase": "A",
+        "phase_name": "neutral",
+        "mode": None,
+        # Arb: no spread
+        "pm_ask": 0.50,
+        "pm_bid": 0.49,
+        "op_ask": 0.51,
+        "op_bid": 0.50,
+        # Sniper: price too high (0.52 > 0.48 trigger)
+        "best_ask": 0.52,
+        "best_bid": 0.51,
+        "gas_cost_usd": 0.0,
+    }
+    series.extend({"tick": i, **neutral} for i in range(3))
 
     # ===== PHASE B: ARB OPPORTUNITY (Ticks 3-5) =====
-    for i in range(3, 6):
-        series.append({
-            "tick": i,
-            "phase": "B",
-            "phase_name": "arb",
-            "mode": "arb",
-            # Arb: BIG spread = 0.60 - 0.45 = 0.15
-            "pm_ask": 0.45,
-            "pm_bid": 0.44,
-            "op_ask": 0.62,
-            "op_bid": 0.60,
-            # Sniper: price too high (0.55 > 0.48)
-            "best_ask": 0.55,
-            "best_bid": 0.54,
-            "gas_cost_usd": 0.0,
-        })
+    arb = {
+        "phase": "B",
+        "phase_name": "arb",
+        "mode": "arb",
+        # Arb: BIG spread = 0.60 - 0.45 = 0.15
+        "pm_ask": 0.45,
+        "pm_bid": 0.44,
+        "op_ask": 0.62,
+        "op_bid": 0.60,
+        # Sniper: price too high (0.55 > 0.48)
+        "best_ask": 0.55,
+        "best_bid": 0.54,
+        "gas_cost_usd": 0.0,
+    }
+    series.extend({"tick": i, **arb} for i in range(3, 6))
 
     # ===== PHASE C: SNIPER OPPORTUNITY (Ticks 6-8) =====
+    sniper = {
+        "phase": "C",
+        "phase_name": "sniper",
+        "mode": "sniper",
+        # Arb: no spread
+        "pm_ask": 0.50,
+        "pm_bid": 0.49,
+        "op_ask": 0.51,
+        "op_bid": 0.50,
+        "gas_cost_usd": 0.0,
+    }
+    # Sniper: price drops! (< 0.48 trigger)
     prices = [0.35, 0.38, 0.41]
-    for i, price in enumerate(prices):
-        series.append({
-            "tick": 6 + i,
-            "phase": "C",
-            "phase_name": "sniper",
-            "mode": "sniper",
-            # Arb: no spread
-            "pm_ask": 0.50,
-            "pm_bid": 0.49,
-            "op_ask": 0.51,
-            "op_bid": 0.50,
-            # Sniper: price drops! (< 0.48 trigger)
-            "best_ask": price,
-            "best_bid": price - 0.01,
-            "gas_cost_usd": 0.0,
-        })
+    series.extend(
+        {"tick": 6 + i, **sniper, "best_ask": price, "best_bid": price - 0.01}
+        for i, price in enumerate(prices)
+    )
 
     # ===== PHASE D: BOTH OPPORTUNITIES (Ticks 9-10) =====
-    for i in range(9, 11):
-        series.append({
-            "tick": i,
-            "phase": "D",
-            "phase_name": "both",
-            "mode": "arb",  # AI PM picks arb when both available
-            # Arb: spread = 0.58 - 0.42 = 0.16
-            "pm_ask": 0.42,
-            "pm_bid": 0.41,
-            "op_ask": 0.60,
-            "op_bid": 0.58,
-            # Sniper: also opportunity (0.40 < 0.48)
-            "best_ask": 0.40,
-            "best_bid": 0.39,
-            "gas_cost_usd": 0.0,
-        })
+    both = {
+        "phase": "D",
+        "phase_name": "both",
+        "mode": "arb",  # AI PM picks arb when both available
+        # Arb: spread = 0.58 - 0.42 = 0.16
+        "pm_ask": 0.42,
+        "pm_bid": 0.41,
+        "op_ask": 0.60,
+        "op_bid": 0.58,
+        # Sniper: also opportunity (0.40 < 0.48)
+        "best_ask": 0.40,
+        "best_bid": 0.39,
+        "gas_cost_usd": 0.0,
+    }
+    series.extend({"tick": i, **both} for i in range(9, 11))
 
     # ===== PHASE E: BACK TO NEUTRAL (Ticks 11-13) =====
-    for i in range(11, 14):
-        series.append({
-            "tick": i,
-            "phase": "E",
-            "phase_name": "neutral",
-            "mode": None,
-            "pm_ask": 0.50,
-            "pm_bid": 0.49,
-            "op_ask": 0.51,
-            "op_bid": 0.50,
-            "best_ask": 0.52,
-            "best_bid": 0.51,
-            "gas_cost_usd": 0.0,
-        })
+    series.extend({"tick": i, **neutral, "phase": "E"} for i in range(11, 14))
 
     return series
 
@@ -187,38 +194,162 @@ def build_series() -> List[Dict[str, Any]]:
 # RUN STRATEGY
 # =============================================================================
 
-def run_with(strategy: BaseStrategy, series: List[Dict]) -> Dict[str, Any]:
+class _OrderRecorder:
+    """
+    Pass-through strategy that records each tick's orders while a BacktestEngine drives it.
+
+    Duck-typed (name + on_tick), which is all the engine calls.
+    """
+
+    def __init__(self, strategy: BaseStrategy) -> None:
+        self.name = strategy.name
+        self.strategy = strategy
+        self.orders_by_tick: Dict[int, List[OrderInstruction]] = {}
+        self.total_orders = 0
+
+    def on_tick(self, market_state: Dict[str, Any]) -> List[OrderInstruction]:
+        orders = self.strategy.on_tick(market_state)
+        # Most ticks are quiet; only ticks with orders get an entry
+        if orders:
+            self.orders_by_tick[market_state["tick"]] = orders
+            self.total_orders += len(orders)
+        return orders
+
+
+def run_with(
+    strategy: BaseStrategy,
+    series: List[Dict],
+    initial_cash: float = 1000.0,
+    engine: Optional[BacktestEngine] = None,
+) -> Dict[str, Any]:
     """
     Run a strategy on the given series and collect orders by tick.
 
+    The run goes through a BacktestEngine, so the same pass also yields the
+    equity curve used for plotting.
+
     Args:
         strategy: Strategy instance to run.
         series: Market data series.
+        initial_cash: Starting cash for the equity curve (when no engine is given).
+        engine: BacktestEngine to reset and reuse, or None to build one.
 
     Returns:
         Dict with:
-        - "orders_by_tick": Dict[int, List[OrderInstruction]]
+        - "orders_by_tick": Dict[int, List[OrderInstruction]] (sparse: only
+          ticks that produced orders; read with .get(tick, []))
         - "total_orders": int
+        - "equity_curve": List[float]
+        - "final_equity": float
+        - "total_return": float
     """
-    orders_by_tick: Dict[int, List[OrderInstruction]] = {}
-    total_orders = 0
+    recorder = _OrderRecorder(strategy)
+    if engine is None:
+        from engine.backtest import BacktestEngine
 
-    for market_state in series:
-        tick = market_state["tick"]
-        orders = strategy.on_tick(market_state)
-        orders_by_tick[tick] = orders
-        total_orders += len(orders)
+        engine = BacktestEngine(recorder, initial_cash=initial_cash)
+    else:
+        engine.reset(recorder)
+    backtest = engine.run(series)
 
     return {
-        "orders_by_tick": orders_by_tick,
-        "total_orders": total_orders,
+        "orders_by_tick": recorder.orders_by_tick,
+        "total_orders": recorder.total_orders,
+        "equity_curve": backtest.equity_curve,
+        "final_equity": backtest.final_equity,
+        "total_return": backtest.total_return,
     }
 
 
+# Below this many ticks, worker start-up costs more than the runs themselves.
+PARALLEL_MIN_TICKS = 50_000
+
+
+def make_ou() -> OUArbStrategy:
+    """OU-only configuration."""
+    from strategies.ou_arb import OUArbStrategy
+
+    return OUArbStrategy(
+        name="ou_arb",
+        min_profit_rate=0.005,
+        min_spread_multiplier=0.5,
+    )
+
+
+def make_sniper() -> SniperStrategy:
+    """Sniper-only configuration."""
+    from strategies.sniper import SniperStrategy
+
+    return SniperStrategy(
+        name="sniper",
+        target_price=0.50,
+        min_gap=0.02,
+        position_size=50.0,
+    )
+
+
+def make_router() -> StrategyRouter:
+    """Router with fresh child strategies."""
+    from strategies.ou_arb import OUArbStrategy
+    from strategies.sniper import SniperStrategy
+    from strategies.router import StrategyRouter
+
+    return StrategyRouter(
+        name="router",
+        ou_strategy=OUArbStrategy(name="ou_arb"),
+        sniper_strategy=SniperStrategy(name="sniper", target_price=0.50, min_gap=0.02),
+        verbose=False,
+    )
+
+
+def _run_one(
+    factory: Callable[[], BaseStrategy],
+    series: List[Dict],
+) -> Tuple[BaseStrategy, Dict[str, Any]]:
+    """Build a fresh strategy from its factory and run it (picklable for worker processes)."""
+    strategy = factory()
+    return strategy, run_with(strategy, series)
+
+
+def run_all(
+    factories: Dict[str, Callable[[], BaseStrategy]],
+    series: List[Dict],
+) -> Dict[str, Tuple[BaseStrategy, Dict[str, Any]]]:
+    """
+    Run every strategy factory on the same series.
+
+    Long series fan out to one worker process per strategy; short ones
+    (like the demo's) run in-process, in the given order.
+
+    Returns:
+        Dict mapping name -> (strategy instance after the run, run_with result).
+    """
+    if len(series) < PARALLEL_MIN_TICKS:
+        from engine.backtest import BacktestEngine
+
+        # One engine, reset between strategies
+        engine: Optional[BacktestEngine] = None
+        runs = {}
+        for name, factory in factories.items():
+            strategy = factory()
+            if engine is None:
+                engine = BacktestEngine(strategy, initial_cash=1000.0)
+            runs[name] = (strategy, run_with(strategy, series, engine=engine))
+        return runs
+
+    with ProcessPoolExecutor(max_workers=len(factories)) as ex:
+        futures = {name: ex.submit(_run_one, factory, series) for name, factory in factories.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
 # =============================================================================
 # PRETTY PRINT
 # =============================================================================
 
+# Every build_series tick carries these keys; fetch them in one C-level call.
+_TICK_FIELDS = itemgetter("tick", "phase", "phase_name", "mode", "pm_ask", "op_bid", "best_ask")
+
+
 def pretty_print_comparison(
     series: List[Dict],
     ou_result: Dict[str, Any],
@@ -239,44 +370,30 @@ def pretty_print_comparison(
     router_orders = router_result["orders_by_tick"]
 
     current_phase = None
+    lines: List[str] = []  # Emitted with one print at the end
 
     for state in series:
-        tick = state["tick"]
-        phase = state["phase"]
-        phase_name = state["phase_name"]
-        mode = state.get("mode")
+        tick, phase, phase_name, mode, pm_ask, op_bid, best_ask = _TICK_FIELDS(state)
 
-        # Print phase header when phase changes
+        # Phase header when phase changes
         if phase != current_phase:
             current_phase = phase
-            print(f"\n{'─' * 70}")
-            print(f" PHASE {phase}: {phase_name.upper()}")
-            print(f"{'─' * 70}")
+            lines.append(PHASE_HEADER.format(phase=phase, name=phase_name.upper()))
 
         # Market state summary
-        pm_ask = state.get("pm_ask", 0)
-        op_bid = state.get("op_bid", 0)
-        best_ask = state.get("best_ask", 0)
         spread = op_bid - pm_ask if pm_ask and op_bid else 0
 
-        print(f"\n[t={tick:02d}] mode={mode or 'None':<7} "
-              f"pm_ask={pm_ask:.2f} op_bid={op_bid:.2f} (spread={spread:.2f}) "
-              f"best_ask={best_ask:.2f}")
-
-        # OU Only
-        ou = ou_orders.get(tick, [])
-        ou_str = describe_orders(ou, show_router_info=False)
-        print(f"  OU Only   -> {ou_str}")
+        lines.append(f"\n[t={tick:02d}] mode={mode or 'None':<7} "
+                     f"pm_ask={pm_ask:.2f} op_bid={op_bid:.2f} (spread={spread:.2f}) "
+                     f"best_ask={best_ask:.2f}")
 
-        # Sniper Only
-        sniper = sniper_orders.get(tick, [])
-        sniper_str = describe_orders(sniper, show_router_info=False)
-        print(f"  Sniper    -> {sniper_str}")
+        # OU Only, Sniper Only, Router (with AI PM info)
+        lines.append(f"  OU Only   -> {describe_orders(ou_orders.get(tick, []), show_router_info=False)}")
+        lines.append(f"  Sniper    -> {describe_orders(sniper_orders.get(tick, []), show_router_info=False)}")
+        lines.append(f"  Router    -> {describe_orders(router_orders.get(tick, []), show_router_info=True)}")
 
-        # Router (with AI PM info)
-        router = router_orders.get(tick, [])
-        router_str = describe_orders(router, show_router_info=True)
-        print(f"  Router    -> {router_str}")
+    if lines:
+        print("\n".join(lines))
 
 
 def print_summary(
@@ -294,11 +411,9 @@ def print_summary(
         router_result: Result from Router run.
         router_strategy: The router instance (for routing stats).
     """
-    print(f"\n{'=' * 70}")
-    print(" SUMMARY")
-    print(f"{'=' * 70}")
+    print(section_header("SUMMARY"))
     print(f"{'Strategy':<20} {'Total Orders':>15}")
-    print(f"{'-' * 40}")
+    print(RULE_40)
     print(f"{'OU Only':<20} {ou_result['total_orders']:>15}")
     print(f"{'Sniper Only':<20} {sniper_result['total_orders']:>15}")
     print(f"{'Router (AI PM)':<20} {router_result['total_orders']:>15}")
@@ -322,9 +437,7 @@ def print_key_decisions(
         series: Original market data series.
         router_result: Result from Router run.
     """
-    print(f"\n{'=' * 70}")
-    print(" KEY ROUTER DECISIONS")
-    print(f"{'=' * 70}")
+    print(section_header("KEY ROUTER DECISIONS"))
 
     router_orders = router_result["orders_by_tick"]
 
@@ -362,16 +475,25 @@ def print_key_decisions(
 # OPTIONAL PLOT
 # =============================================================================
 
+# Background shading per build_series phase (A-E): (x start, x end, color).
+_PHASE_SPANS = (
+    (-0.5, 2.5, "gray"),
+    (2.5, 5.5, "blue"),
+    (5.5, 8.5, "orange"),
+    (8.5, 10.5, "purple"),
+    (10.5, 13.5, "gray"),
+)
+
+
 def plot_equity_curves(
-    series: List[Dict],
-    ou_strategy: OUArbStrategy,
-    sniper_strategy: SniperStrategy,
-    router_strategy: StrategyRouter,
+    ou_result: Dict[str, Any],
+    sniper_result: Dict[str, Any],
+    router_result: Dict[str, Any],
 ) -> None:
     """
-    Plot equity curves using BacktestEngine (optional).
+    Plot equity curves (optional).
 
-    This uses the full BacktestEngine for accurate equity tracking.
+    Uses the BacktestEngine equity curves already produced by run_with.
     """
     try:
         import matplotlib
@@ -381,34 +503,20 @@ def plot_equity_curves(
         print("\n[Note] matplotlib not installed, skipping plot.")
         return
 
-    from engine.backtest import BacktestEngine
-
-    # Run full backtests
-    ou_engine = BacktestEngine(ou_strategy, initial_cash=1000.0)
-    sniper_engine = BacktestEngine(sniper_strategy, initial_cash=1000.0)
-    router_engine = BacktestEngine(router_strategy, initial_cash=1000.0)
-
-    ou_result = ou_engine.run(series)
-    sniper_result = sniper_engine.run(series)
-    router_result = router_engine.run(series)
-
     # Plot
     fig, ax = plt.subplots(figsize=(12, 6))
-    ticks = list(range(len(ou_result.equity_curve)))
+    ticks = range(len(ou_result["equity_curve"]))
 
-    ax.plot(ticks, ou_result.equity_curve, label=f"OU Only (${ou_result.final_equity:.0f})",
+    ax.plot(ticks, ou_result["equity_curve"], label=f"OU Only (${ou_result['final_equity']:.0f})",
             marker="o", linewidth=2)
-    ax.plot(ticks, sniper_result.equity_curve, label=f"Sniper Only (${sniper_result.final_equity:.0f})",
+    ax.plot(ticks, sniper_result["equity_curve"], label=f"Sniper Only (${sniper_result['final_equity']:.0f})",
             marker="s", linewidth=2)
-    ax.plot(ticks, router_result.equity_curve, label=f"Router (${router_result.final_equity:.0f})",
+    ax.plot(ticks, router_result["equity_curve"], label=f"Router (${router_result['final_equity']:.0f})",
             marker="^", linewidth=2, color="green")
 
     # Phase backgrounds
-    ax.axvspan(-0.5, 2.5, alpha=0.1, color="gray")
-    ax.axvspan(2.5, 5.5, alpha=0.1, color="blue")
-    ax.axvspan(5.5, 8.5, alpha=0.1, color="orange")
-    ax.axvspan(8.5, 10.5, alpha=0.1, color="purple")
-    ax.axvspan(10.5, 13.5, alpha=0.1, color="gray")
+    for x0, x1, color in _PHASE_SPANS:
+        ax.axvspan(x0, x1, alpha=0.1, color=color)
 
     ax.set_xlabel("Tick")
     ax.set_ylabel("Equity ($)")
@@ -418,13 +526,14 @@ def plot_equity_curves(
 
     plt.tight_layout()
     plt.savefig("equity_comparison.png", dpi=150)
+    plt.close(fig)  # Release the figure; nothing is shown interactively
     print(f"\n[Plot saved to 'equity_comparison.png']")
 
     # Print final equities
     print(f"\nFinal Equities:")
-    print(f"  OU Only:       ${ou_result.final_equity:.2f} ({ou_result.total_return:+.1%})")
-    print(f"  Sniper Only:   ${sniper_result.final_equity:.2f} ({sniper_result.total_return:+.1%})")
-    print(f"  Router (AI PM):${router_result.final_equity:.2f} ({router_result.total_return:+.1%})")
+    print(f"  OU Only:       ${ou_result['final_equity']:.2f} ({ou_result['total_return']:+.1%})")
+    print(f"  Sniper Only:   ${sniper_result['final_equity']:.2f} ({sniper_result['total_return']:+.1%})")
+    print(f"  Router (AI PM):${router_result['final_equity']:.2f} ({router_result['total_return']:+.1%})")
 
     print()
     print("Takeaway: Router allocates more to OU in the arbitrage phase,")
@@ -440,14 +549,14 @@ def main():
     """
     Main entry point: run comparison demo.
     """
-    print("=" * 70)
+    print(SEP_70)
     print(" DEMO: Compare OU / Sniper / Router on synthetic series")
     print(" Shows how Router switches strategies based on AI PM decisions")
     print()
     print(" - OU:      cross-market arbitrage between Polymarket and a CEX opinion market")
     print(" - Sniper:  directional entries on underpriced asks")
     print(" - Router:  asks an AI PM to choose between OU / Sniper on each tick")
-    print("=" * 70)
+    print(SEP_70)
 
     # 1. Build series
     series = build_series()
@@ -458,33 +567,12 @@ def main():
     print("  D: Both (9-10)    -> Both opportunities")
     print("  E: Neutral (11-13)-> Back to quiet")
 
-    # 2. Instantiate strategies
-    ou_strategy = OUArbStrategy(
-        name="ou_arb",
-        min_profit_rate=0.005,
-        min_spread_multiplier=0.5,
-    )
-
-    sniper_strategy = SniperStrategy(
-        name="sniper",
-        target_price=0.50,
-        min_gap=0.02,
-        position_size=50.0,
-    )
-
-    # Router with fresh child strategies
-    router_strategy = StrategyRouter(
-        name="router",
-        ou_strategy=OUArbStrategy(name="ou_arb"),
-        sniper_strategy=SniperStrategy(name="sniper", target_price=0.50, min_gap=0.02),
-        verbose=False,
-    )
-
-    # 3. Run all strategies
+    # 2-3. Instantiate and run all strategies
     print("\nRunning strategies...")
-    ou_result = run_with(ou_strategy, series)
-    sniper_result = run_with(sniper_strategy, series)
-    router_result = run_with(router_strategy, series)
+    runs = run_all({"ou": make_ou, "sniper": make_sniper, "router": make_router}, series)
+    _, ou_result = runs["ou"]
+    _, sniper_result = runs["sniper"]
+    router_strategy, router_result = runs["router"]
 
     # 4. Pretty print tick-by-tick comparison
     pretty_print_comparison(series, ou_result, sniper_result, router_result)
@@ -495,16 +583,10 @@ def main():
     # 6. Print summary
     print_summary(ou_result, sniper_result, router_result, router_strategy)
 
-    # 7. Optional: Plot equity curves
-    # Re-instantiate strategies since they may have state
-    ou_strategy2 = OUArbStrategy(name="ou_arb")
-    sniper_strategy2 = SniperStrategy(name="sniper", target_price=0.50, min_gap=0.02)
-    router_strategy2 = StrategyRouter(name="router")
-    plot_equity_curves(series, ou_strategy2, sniper_strategy2, router_strategy2)
+    # 7. Optional: Plot equity curves (from the runs above, no second pass)
+    plot_equity_curves(ou_result, sniper_result, router_result)
 
-    print(f"\n{'=' * 70}")
-    print(" DEMO COMPLETE")
-    print(f"{'=' * 70}")
+    print(section_header("DEMO COMPLETE"))
 
 
 if __name__ == "__main__":
@@ -24,24 +24,47 @@ from __future__ import annotations
 
 import json
 import sys
+import textwrap
+from operator import attrgetter
 from typing import Any, Dict, List
 
 from news_replay import (
     NewsCase,
     load_news_cases,
     filter_cases,
-    summarize_cases,
-    analyze_pattern_with_llm,
+    analyze_cases,
 )
 from strategies.ai_pm import decide_strategy, reset_state
 from strategies.router import StrategyRouter
 from infra.position_sizing import calculate_kelly_position
 
+# Optional faster JSON encoder for the decision dump
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # =============================================================================
 # HELPERS
 # =============================================================================
 
+# Separator lines, built once
+SEP_70 = "=" * 70
+RULE_70 = "-" * 70
+
+
+def _dumps(obj: Any) -> str:
+    """Pretty JSON (2-space indent, unescaped non-ASCII); orjson if installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+# Sort key for listing cases chronologically
+_BY_DATE = attrgetter("event_date")
+
+
 def _format_pct(value: float) -> str:
     """Format a decimal return as a percentage string with sign."""
     pct = value * 100
@@ -56,6 +79,7 @@ def print_pretty_news_report(
     cases: List[NewsCase],
     summary: Dict[str, Any],
     pattern: Dict[str, Any],
+    presorted: bool = False,
 ) -> None:
     """
     Nicely print:
@@ -63,76 +87,81 @@ def print_pretty_news_report(
     - Each NewsCase: date, headline, 1D/3D returns, short summary
     - Aggregate stats from `summary`
     - Pattern info from `pattern`
+
+    Pass presorted=True if `cases` is already in event_date order.
     """
+    lines: List[str] = []  # Emitted with one print at the end
     count = int(summary.get("count", len(cases)))
 
     # Header
-    print()
-    print("=" * 70)
-    print(f"  NEWS REPLAY: {symbol} ({count} historical cases)")
-    print("=" * 70)
-    print()
+    lines.append("")
+    lines.append(SEP_70)
+    lines.append(f"  NEWS REPLAY: {symbol} ({count} historical cases)")
+    lines.append(SEP_70)
+    lines.append("")
 
     if count == 0:
-        print("  (No matching data found)")
-        print()
+        lines.append("  (No matching data found)")
+        lines.append("")
+        print("\n".join(lines))
         return
 
     # Sort cases by date ascending
-    sorted_cases = sorted(cases, key=lambda c: c.event_date)
+    sorted_cases = cases if presorted else sorted(cases, key=_BY_DATE)
 
     # List each case
-    print("-" * 70)
-    print(" HISTORICAL NEWS EVENTS")
-    print("-" * 70)
+    lines.append(RULE_70)
+    lines.append(" HISTORICAL NEWS EVENTS")
+    lines.append(RULE_70)
     for i, case in enumerate(sorted_cases, start=1):
-        print(f"\n{i}) [{case.event_date}] {case.news_headline}")
-        print(f"   Regime: {case.regime}  |  Tag: {case.source_tag}")
-        print(f"   Returns: 1D={_format_pct(case.return_1d)}, "
-              f"3D={_format_pct(case.return_3d)}, "
-              f"7D={_format_pct(case.return_7d)}")
+        lines.append(f"\n{i}) [{case.event_date}] {case.news_headline}")
+        lines.append(f"   Regime: {case.regime}  |  Tag: {case.source_tag}")
+        lines.append(f"   Returns: 1D={_format_pct(case.return_1d)}, "
+                     f"3D={_format_pct(case.return_3d)}, "
+                     f"7D={_format_pct(case.return_7d)}")
         # Truncate summary if too long
         summary_text = case.news_summary
         if len(summary_text) > 70:
             summary_text = summary_text[:67] + "..."
-        print(f"   Summary: {summary_text}")
+        lines.append(f"   Summary: {summary_text}")
 
     # Summary statistics
-    print()
-    print("-" * 70)
-    print(" AGGREGATE STATISTICS")
-    print("-" * 70)
-    print(f"  Sample count:     {count}")
-    print(f"  Avg 1D return:    {_format_pct(summary['avg_return_1d'])} "
-          f"(positive: {summary['pos_ratio_1d'] * 100:.0f}%)")
-    print(f"  Avg 3D return:    {_format_pct(summary['avg_return_3d'])} "
-          f"(positive: {summary['pos_ratio_3d'] * 100:.0f}%)")
-    print(f"  Avg 7D return:    {_format_pct(summary['avg_return_7d'])} "
-          f"(positive: {summary['pos_ratio_7d'] * 100:.0f}%)")
+    lines.append("")
+    lines.append(RULE_70)
+    lines.append(" AGGREGATE STATISTICS")
+    lines.append(RULE_70)
+    lines.append(f"  Sample count:     {count}")
+    lines.append(f"  Avg 1D return:    {_format_pct(summary['avg_return_1d'])} "
+                 f"(positive: {summary['pos_ratio_1d'] * 100:.0f}%)")
+    lines.append(f"  Avg 3D return:    {_format_pct(summary['avg_return_3d'])} "
+                 f"(positive: {summary['pos_ratio_3d'] * 100:.0f}%)")
+    lines.append(f"  Avg 7D return:    {_format_pct(summary['avg_return_7d'])} "
+                 f"(positive: {summary['pos_ratio_7d'] * 100:.0f}%)")
 
     # Pattern analysis
-    print()
-    print("-" * 70)
-    print(" HISTORICAL PATTERN ANALYSIS")
-    print("-" * 70)
-    print(f"  Pattern name:     {pattern.get('pattern_name', 'N/A')}")
-    print(f"  Avg return (1D):  {_format_pct(pattern.get('avg_return_1d', 0) or 0)}")
-    print(f"  Avg return (3D):  {_format_pct(pattern.get('avg_return_3d', 0) or 0)}")
-    print(f"  Avg return (7D):  {_format_pct(pattern.get('avg_return_7d', 0) or 0)}")
-    print(f"  Confidence:       {pattern.get('confidence', 0):.2f} ({pattern.get('confidence_level', 'N/A')})")
-    print(f"  Typical horizon:  {pattern.get('typical_horizon', 'N/A')}")
-    print(f"  Analysis method:  {pattern.get('analysis_method', 'N/A')}")
+    lines.append("")
+    lines.append(RULE_70)
+    lines.append(" HISTORICAL PATTERN ANALYSIS")
+    lines.append(RULE_70)
+    lines.append(f"  Pattern name:     {pattern.get('pattern_name', 'N/A')}")
+    lines.append(f"  Avg return (1D):  {_format_pct(pattern.get('avg_return_1d', 0) or 0)}")
+    lines.append(f"  Avg return (3D):  {_format_pct(pattern.get('avg_return_3d', 0) or 0)}")
+    lines.append(f"  Avg return (7D):  {_format_pct(pattern.get('avg_return_7d', 0) or 0)}")
+    lines.append(f"  Confidence:       {pattern.get('confidence', 0):.2f} ({pattern.get('confidence_level', 'N/A')})")
+    lines.append(f"  Typical horizon:  {pattern.get('typical_horizon', 'N/A')}")
+    lines.append(f"  Analysis method:  {pattern.get('analysis_method', 'N/A')}")
 
     # Show comment
     if pattern.get("comment"):
-        print(f"  Comment:          {pattern['comment']}")
+        lines.append(f"  Comment:          {pattern['comment']}")
 
     # Show LLM status via note field
     note = pattern.get("note")
     if note:
-        print(f"  [Note] {note}")
+        lines.append(f"  [Note] {note}")
 
-    print()
+    lines.append("")
+    print("\n".join(lines))
 
 
 def build_demo_market_state(
@@ -215,78 +244,76 @@ def build_demo_market_state(
 
 def print_market_state(market_state: Dict[str, Any]) -> None:
     """Print the demo market state in a readable format."""
-    print("-" * 70)
-    print(" DEMO MARKET STATE")
-    print("-" * 70)
-    print(f"  Symbol:       {market_state.get('symbol', 'N/A')}")
-    print(f"  Event date:   {market_state.get('event_date', 'N/A')}")
-    print(f"  Mode hint:    {market_state.get('mode', 'None')}")
-    print()
-    print(f"  PM ask:       {market_state.get('pm_ask', 0):.2f}")
-    print(f"  OP bid:       {market_state.get('op_bid', 0):.2f}")
-    print(f"  Spread:       {market_state.get('spread', 0):.2f}")
-    print(f"  Best ask:     {market_state.get('best_ask', 0):.2f}")
-    print()
+    lines: List[str] = []  # Emitted with one print at the end
+    lines.append(RULE_70)
+    lines.append(" DEMO MARKET STATE")
+    lines.append(RULE_70)
+    lines.append(f"  Symbol:       {market_state.get('symbol', 'N/A')}")
+    lines.append(f"  Event date:   {market_state.get('event_date', 'N/A')}")
+    lines.append(f"  Mode hint:    {market_state.get('mode', 'None')}")
+    lines.append("")
+    lines.append(f"  PM ask:       {market_state.get('pm_ask', 0):.2f}")
+    lines.append(f"  OP bid:       {market_state.get('op_bid', 0):.2f}")
+    lines.append(f"  Spread:       {market_state.get('spread', 0):.2f}")
+    lines.append(f"  Best ask:     {market_state.get('best_ask', 0):.2f}")
+    lines.append("")
 
     # Show headline (truncated)
     headline = market_state.get("news_headline", "")
     if len(headline) > 60:
         headline = headline[:57] + "..."
-    print(f"  Headline:     {headline}")
-    print()
+    lines.append(f"  Headline:     {headline}")
+    lines.append("")
+    print("\n".join(lines))
 
 
 def print_ai_decision(decision: Dict[str, Any]) -> None:
     """Print the AI PM decision in a formatted way."""
-    print(f"  Strategy:     {decision.get('chosen_strategy', 'N/A')}")
-    print(f"  Risk mode:    {decision.get('risk_mode', 'N/A')}")
-    print(f"  Confidence:   {decision.get('confidence', 0):.2f}")
-    print()
-    print(f"  Reason:")
-    # Word-wrap the reason if it's long
+    lines: List[str] = []  # Emitted with one print at the end
+    lines.append(f"  Strategy:     {decision.get('chosen_strategy', 'N/A')}")
+    lines.append(f"  Risk mode:    {decision.get('risk_mode', 'N/A')}")
+    lines.append(f"  Confidence:   {decision.get('confidence', 0):.2f}")
+    lines.append("")
+    lines.append(f"  Reason:")
+    # Word-wrap the reason to 70 columns, indented under the label
     reason = decision.get("reason", "N/A")
-    if len(reason) > 65:
-        # Simple word wrap
-        words = reason.split()
-        lines = []
-        current_line = "    "
-        for word in words:
-            if len(current_line) + len(word) + 1 > 70:
-                lines.append(current_line)
-                current_line = "    " + word
-            else:
-                current_line += " " + word if current_line.strip() else "    " + word
-        if current_line.strip():
-            lines.append(current_line)
-        print("\n".join(lines))
-    else:
-        print(f"    {reason}")
-    print()
+    lines.append(textwrap.fill(
+        reason,
+        width=70,
+        initial_indent="    ",
+        subsequent_indent="    ",
+        break_long_words=False,
+    ))
+    lines.append("")
+    print("\n".join(lines))
 
 
 def print_router_orders(orders: List[Any], router: StrategyRouter) -> None:
     """Print the orders generated by the router."""
+    lines: List[str] = []  # Emitted with one print at the end
     if not orders:
-        print("  (No orders generated)")
-        print()
-        print("  This can happen when:")
-        print("  - The chosen strategy doesn't find a valid opportunity")
-        print("  - Market conditions don't meet strategy thresholds")
+        lines.append("  (No orders generated)")
+        lines.append("")
+        lines.append("  This can happen when:")
+        lines.append("  - The chosen strategy doesn't find a valid opportunity")
+        lines.append("  - Market conditions don't meet strategy thresholds")
+        print("\n".join(lines))
         return
 
     for i, order in enumerate(orders, start=1):
-        print(f"  Order {i}:")
-        print(f"    Side:     {order.side}")
-        print(f"    Size:     {order.size:.2f}")
-        print(f"    Price:    {order.price:.2f}")
+        lines.append(f"  Order {i}:")
+        lines.append(f"    Side:     {order.side}")
+        lines.append(f"    Size:     {order.size:.2f}")
+        lines.append(f"    Price:    {order.price:.2f}")
 
         if order.meta:
             routing_mode = order.meta.get("routing_mode", "N/A")
             ai_reason = order.meta.get("ai_reason", "N/A")
             ai_risk = order.meta.get("ai_risk_mode", "N/A")
-            print(f"    Routed:   {routing_mode}")
-            print(f"    Risk:     {ai_risk}")
-        print()
+            lines.append(f"    Routed:   {routing_mode}")
+            lines.append(f"    Risk:     {ai_risk}")
+        lines.append("")
+    print("\n".join(lines))
 
 
 # =============================================================================
@@ -298,10 +325,10 @@ def main() -> None:
     Main entry point for the news-driven demo.
     """
     print()
-    print("=" * 70)
+    print(SEP_70)
     print(" DEMO: News-Driven AI Portfolio Manager")
     print(" Combines historical news patterns with AI PM decision-making")
-    print("=" * 70)
+    print(SEP_70)
 
     # 1) Load all cases
     cases = load_news_cases()
@@ -331,15 +358,15 @@ def main() -> None:
         print(f"  {', '.join(available)}")
         return
 
-    # 4) Compute summary stats
-    summary = summarize_cases(symbol_cases)
-
-    # 5) Get historical pattern via LLM (or fallback rule-based)
-    #    Automatically respects AI_PM_USE_LLM env var and force_llm parameter
-    pattern = analyze_pattern_with_llm(symbol_cases)
+    # 4-5) Summary stats and historical pattern (LLM or fallback rule-based),
+    #      sharing one pass over the cases.
+    #      Automatically respects AI_PM_USE_LLM env var and force_llm parameter
+    summary, pattern = analyze_cases(symbol_cases)
 
-    # 6) Pretty-print the news + stats + pattern
-    print_pretty_news_report(symbol, symbol_cases, summary, pattern)
+    # 6) Pretty-print the news + stats + pattern. Cases are listed by date;
+    #    the pattern and latest_case stay on the CSV order.
+    cases_by_date = sorted(symbol_cases, key=_BY_DATE)
+    print_pretty_news_report(symbol, cases_by_date, summary, pattern, presorted=True)
 
     # 7) Build a demo market_state using the latest case
     latest_case = symbol_cases[-1]
@@ -349,9 +376,9 @@ def main() -> None:
     print("Using the above historical pattern as a prior, we now simulate a new trading day:")
     print()
 
-    print("=" * 70)
+    print(SEP_70)
     print(" SIMULATED TRADING SCENARIO")
-    print("=" * 70)
+    print(SEP_70)
     print()
     print_market_state(market_state)
 
@@ -359,25 +386,25 @@ def main() -> None:
     reset_state()
 
     # 9) Call AI PM to get decision
-    print("=" * 70)
+    print(SEP_70)
     print(" AI PM DECISION")
-    print("=" * 70)
+    print(SEP_70)
     print()
 
     decision = decide_strategy(market_state)
     print_ai_decision(decision)
 
     # 10) Show raw decision JSON
-    print("-" * 70)
+    print(RULE_70)
     print(" Raw Decision JSON:")
-    print("-" * 70)
-    print(json.dumps(decision, indent=2, ensure_ascii=False))
+    print(RULE_70)
+    print(_dumps(decision))
 
     # 11) Run through StrategyRouter to see what orders it produces
     print()
-    print("=" * 70)
+    print(SEP_70)
     print(" STRATEGY ROUTER ORDERS")
-    print("=" * 70)
+    print(SEP_70)
     print()
 
     router = StrategyRouter(verbose=False)
@@ -388,18 +415,18 @@ def main() -> None:
     # 12) Show router's last decision for transparency
     router_decision = router.get_last_decision()
     if router_decision:
-        print("-" * 70)
+        print(RULE_70)
         print(" Router's AI PM Decision:")
-        print("-" * 70)
+        print(RULE_70)
         print(f"  Strategy chosen: {router_decision.get('chosen_strategy')}")
         print(f"  Risk mode:       {router_decision.get('risk_mode')}")
         print(f"  Confidence:      {router_decision.get('confidence', 0):.2f}")
 
     # 12.5) Kelly-style Position Sizing (Demo Display Only)
     print()
-    print("-" * 70)
+    print(RULE_70)
     print(" Kelly-style Position Sizing (Demo)")
-    print("-" * 70)
+    print(RULE_70)
 
     # Demo capital
     base_capital = 10_000.0
@@ -428,9 +455,9 @@ def main() -> None:
 
     # 13) Final summary
     print()
-    print("=" * 70)
+    print(SEP_70)
     print(" DEMO COMPLETE")
-    print("=" * 70)
+    print(SEP_70)
     print()
     print("Key takeaways:")
     print(f"  - Symbol analyzed:        {symbol}")
@@ -12,17 +12,19 @@ Design principles:
 - No leverage, no complex fees (those belong in Step 3B+)
 """
 
+from array import array
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from itertools import accumulate, islice
+from typing import Any, Callable, Dict, List, Optional, Sequence
 from datetime import datetime
 
 from strategies.base import BaseStrategy, OrderInstruction
 
 
-@dataclass
+@dataclass(slots=True)
 class Trade:
     """
-    Record of an executed trade.
+    Record of an executed trade (slotted: one is kept per fill).
     """
     tick: int
     timestamp: Optional[Any]
@@ -35,10 +37,10 @@ class Trade:
     meta: Optional[Dict[str, Any]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class BacktestResult:
     """
-    Complete result of a backtest run.
+    Complete result of a backtest run (slotted, like Trade).
     """
     strategy_name: str
     initial_cash: float
@@ -58,6 +60,40 @@ class BacktestResult:
     max_drawdown: float = 0.0   # Maximum peak-to-trough decline
 
 
+def _max_drawdown(equity_curve: Sequence[float], initial_peak: float) -> float:
+    """
+    Largest peak-to-trough decline, as a fraction of the running peak.
+
+    The running peak starts at `initial_peak`; ticks whose peak is not
+    positive count as zero drawdown.
+    """
+    # accumulate(max) yields the running peak (C-level); drop the seed value
+    peaks = islice(accumulate(equity_curve, max, initial=initial_peak), 1, None)
+    drawdowns = ((peak - equity) / peak for peak, equity in zip(peaks, equity_curve) if peak > 0)
+    return max(drawdowns, default=0.0)
+
+
+# Order sides as strategies spell them -> canonical form (other spellings
+# fall back to str.upper())
+_CANONICAL_SIDES = {"BUY": "BUY", "SELL": "SELL", "buy": "BUY", "sell": "SELL"}
+
+# Quote keys in lookup order; the first truthy value wins
+_ASK_KEYS = ("best_ask", "pm_ask", "ask")
+_BID_KEYS = ("best_bid", "op_bid", "bid")
+_BUY_PRICE_KEYS = _ASK_KEYS + ("price", "mid_price")
+_SELL_PRICE_KEYS = _BID_KEYS + ("price", "mid_price")
+
+
+def _first_quote(market_state: Dict[str, Any], keys: Sequence[str]) -> Optional[float]:
+    """First truthy value among `keys` in `market_state`, or None."""
+    get = market_state.get
+    for key in keys:
+        value = get(key)
+        if value:
+            return value
+    return None
+
+
 class BacktestEngine:
     """
     Single-Strategy Backtester.
@@ -98,14 +134,29 @@ class BacktestEngine:
         # State variables (reset on each run)
         self.cash: float = initial_cash
         self.position: float = 0.0  # Number of units held
-        self.equity_curve: List[float] = []
+        self.equity_curve: array = array("d")
         self.trades: List[Trade] = []
 
+    def reset(self, strategy: Optional[BaseStrategy] = None) -> None:
+        """
+        Rewind the engine for another run, optionally swapping the strategy.
+
+        Lets one engine run several strategies back to back. Buffers are
+        replaced rather than cleared in place, because earlier
+        BacktestResults still reference theirs.
+
+        Args:
+            strategy: Strategy for the next run, or None to keep the current one.
+        """
+        if strategy is not None:
+            self.strategy = strategy
+        self._reset()
+
     def _reset(self) -> None:
         """Reset state for a new backtest run."""
         self.cash = self.initial_cash
         self.position = 0.0
-        self.equity_curve = []
+        self.equity_curve = array("d")
         self.trades = []
 
     def _get_execution_price(
@@ -128,24 +179,9 @@ class BacktestEngine:
         Returns:
             Execution price, or None if no valid price found.
         """
-        if side == "BUY":
-            # Try ask price first (various naming conventions)
-            price = (
-                market_state.get("best_ask") or
-                market_state.get("pm_ask") or
-                market_state.get("ask") or
-                market_state.get("price") or
-                market_state.get("mid_price")
-            )
-        else:  # SELL
-            # Try bid price first
-            price = (
-                market_state.get("best_bid") or
-                market_state.get("op_bid") or
-                market_state.get("bid") or
-                market_state.get("price") or
-                market_state.get("mid_price")
-            )
+        # BUY fills at the ask, SELL at the bid
+        keys = _BUY_PRICE_KEYS if side == "BUY" else _SELL_PRICE_KEYS
+        price = _first_quote(market_state, keys)
 
         return price if price and price > 0 else None
 
@@ -166,18 +202,8 @@ class BacktestEngine:
             return market_state["mid_price"]
 
         # Calculate mid from bid/ask
-        bid = (
-            market_state.get("best_bid") or
-            market_state.get("op_bid") or
-            market_state.get("bid") or
-            0
-        )
-        ask = (
-            market_state.get("best_ask") or
-            market_state.get("pm_ask") or
-            market_state.get("ask") or
-            0
-        )
+        bid = _first_quote(market_state, _BID_KEYS) or 0
+        ask = _first_quote(market_state, _ASK_KEYS) or 0
 
         if bid > 0 and ask > 0:
             return (bid + ask) / 2
@@ -190,6 +216,35 @@ class BacktestEngine:
             0.5  # Default if nothing available
         )
 
+    def _mark_price_getter(self, first_tick: Dict[str, Any]) -> Callable[[Dict[str, Any]], float]:
+        """
+        Mark-price function specialised to the quote layout of `first_tick`.
+
+        The fast path only applies to ticks that actually carry the sniffed
+        keys; any other tick goes through _get_mark_price, so series that mix
+        quote layouts still mark correctly.
+        """
+        general = self._get_mark_price
+
+        if "mid_price" in first_tick:
+            def mark(market_state: Dict[str, Any]) -> float:
+                if "mid_price" in market_state:
+                    return market_state["mid_price"]
+                return general(market_state)
+            return mark
+
+        if "best_bid" in first_tick and "best_ask" in first_tick:
+            def mark(market_state: Dict[str, Any]) -> float:
+                if "mid_price" not in market_state:
+                    bid = market_state.get("best_bid")
+                    ask = market_state.get("best_ask")
+                    if bid and ask and bid > 0 and ask > 0:
+                        return (bid + ask) / 2
+                return general(market_state)
+            return mark
+
+        return general
+
     def _execute_order(
         self,
         instruction: OrderInstruction,
@@ -207,7 +262,7 @@ class BacktestEngine:
         Returns:
             Trade record if executed, None if rejected.
         """
-        side = instruction.side.upper()
+        side = _CANONICAL_SIDES.get(instruction.side) or instruction.side.upper()
         size = instruction.size
 
         # Skip invalid orders
@@ -289,34 +344,42 @@ class BacktestEngine:
         if not market_data:
             return self._build_result()
 
-        # Track for drawdown calculation
-        peak_equity = self.initial_cash
-        max_drawdown = 0.0
+        # Preallocate the equity curve; each tick writes its slot in place
+        self.equity_curve = array("d", bytes(8 * len(market_data)))
+
+        # Mark price lookup specialised to the series' quote layout; only
+        # called on ticks that hold a position
+        mark_price = self._mark_price_getter(market_data[0])
+
+        # Bind hot-loop attributes once
+        on_tick = self.strategy.on_tick
+        execute = self._execute_order
+        record_trade = self.trades.append
+        equity_curve = self.equity_curve
 
         # Main backtest loop
         for tick, market_state in enumerate(market_data):
             # 1. Call strategy to get order instructions
-            instructions = self.strategy.on_tick(market_state)
+            instructions = on_tick(market_state)
 
             # 2. Execute each instruction
-            for instruction in instructions:
-                trade = self._execute_order(instruction, market_state, tick)
-                if trade:
-                    self.trades.append(trade)
-
-            # 3. Calculate current equity (cash + position * mark_price)
-            mark_price = self._get_mark_price(market_state)
-            equity = self.cash + self.position * mark_price
-            self.equity_curve.append(equity)
-
-            # 4. Update drawdown tracking
-            if equity > peak_equity:
-                peak_equity = equity
-            drawdown = (peak_equity - equity) / peak_equity if peak_equity > 0 else 0
-            if drawdown > max_drawdown:
-                max_drawdown = drawdown
-
-        return self._build_result(max_drawdown)
+            if instructions:
+                for instruction in instructions:
+                    trade = execute(instruction, market_state, tick)
+                    if trade:
+                        record_trade(trade)
+
+            # 3. Calculate current equity (cash + position * mark_price);
+            #    a tick that ends flat is worth exactly the cash, so the mark
+            #    is only looked up while holding a position
+            position = self.position
+            if position:
+                equity_curve[tick] = self.cash + position * mark_price(market_state)
+            else:
+                equity_curve[tick] = self.cash
+
+        # 4. Drawdown in one pass over the finished curve
+        return self._build_result(_max_drawdown(self.equity_curve, self.initial_cash))
 
     def _build_result(self, max_drawdown: float = 0.0) -> BacktestResult:
         """
@@ -332,17 +395,16 @@ class BacktestEngine:
         total_return = (final_equity - self.initial_cash) / self.initial_cash if self.initial_cash > 0 else 0
 
         # Count winning/losing trades
-        winning = 0
-        losing = 0
-        for i, trade in enumerate(self.trades):
-            if trade.side == "SELL" and i > 0:
-                # Find the corresponding buy
-                # Simple heuristic: compare sell price to average buy price
-                # For a proper implementation, we'd track entry prices
-                if trade.price > self.trades[i-1].price:
-                    winning += 1
-                else:
-                    losing += 1
+        # Simple heuristic: a SELL (other than the first trade) wins if it is
+        # priced above the trade before it. For a proper implementation, we'd
+        # track entry prices.
+        sell_wins = [
+            trade.price > prev.price
+            for prev, trade in zip(self.trades, islice(self.trades, 1, None))
+            if trade.side == "SELL"
+        ]
+        winning = sum(sell_wins)
+        losing = len(sell_wins) - winning
 
         return BacktestResult(
             strategy_name=self.strategy.name,
@@ -354,7 +416,7 @@ class BacktestEngine:
             total_trades=len(self.trades),
             winning_trades=winning,
             losing_trades=losing,
-            equity_curve=self.equity_curve,
+            equity_curve=self.equity_curve.tolist(),  # Built in an array('d'); returned as a list
             trades=self.trades,
             max_equity=max(self.equity_curve) if self.equity_curve else self.initial_cash,
             min_equity=min(self.equity_curve) if self.equity_curve else self.initial_cash,
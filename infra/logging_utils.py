@@ -1,10 +1,20 @@
 # infra/logging_utils.py
 import logging
 import sys
+from functools import lru_cache
 
+# 日志格式：时间 - 级别 - 消息 (所有 handler 共用同一个 Formatter)
+LOG_FORMATTER = logging.Formatter(
+    "%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S"
+)
+
+@lru_cache(maxsize=None)
 def setup_logger(name: str = "AI_Router"):
     """
     配置并返回一个标准的 Logger。
+
+    同名 logger 只配置一次，之后直接返回缓存的实例。
     """
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
@@ -14,13 +24,7 @@ def setup_logger(name: str = "AI_Router"):
         # 创建控制台处理器
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(logging.INFO)
-
-        # 设置日志格式：时间 - 级别 - 消息
-        formatter = logging.Formatter(
-            "%(asctime)s - %(levelname)s - %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S"
-        )
-        console_handler.setFormatter(formatter)
+        console_handler.setFormatter(LOG_FORMATTER)
 
         # 给 logger 装上处理器
         logger.addHandler(console_handler)
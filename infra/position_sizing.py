@@ -5,7 +5,7 @@ Kelly-style position sizing for display purposes in demos.
 This module does NOT affect actual order sizing in the router.
 """
 
-from typing import Dict
+from typing import Dict, Iterable, List
 
 
 def calculate_kelly_position(
@@ -61,3 +61,36 @@ def calculate_kelly_position(
         "fraction_applied": f_final,
         "notional": notional,
     }
+
+
+def calculate_kelly_position_batch(
+    total_capital: float,
+    ai_confidences: Iterable[float],
+    win_loss_ratio: float = 2.0,
+    max_fraction: float = 0.20,
+) -> Dict[str, List[float]]:
+    """
+    Kelly sizing for many confidences at once (e.g. parameter sweeps).
+
+    Same formula as `calculate_kelly_position`, with the shared terms
+    computed once. Returns the same keys, each mapped to a list with one
+    entry per confidence, in input order.
+
+    Example:
+        >>> batch = calculate_kelly_position_batch(10000, [0.3, 0.65])
+        >>> batch["notional"]
+        [0.0, 2000.0]
+    """
+    b = max(win_loss_ratio, 1e-6)  # Avoid division by zero
+
+    p = [max(0.0, min(c, 1.0)) for c in ai_confidences]
+    f_raw = [(b * pi - (1.0 - pi)) / b for pi in p]
+    f_half = [0.5 * f for f in f_raw]
+    f_final = [max(0.0, min(f, max_fraction)) for f in f_half]
+
+    return {
+        "fraction_raw": f_raw,
+        "fraction_half": f_half,
+        "fraction_applied": f_final,
+        "notional": [total_capital * f for f in f_final],
+    }
@@ -13,27 +13,43 @@ Usage:
 from __future__ import annotations
 
 import csv
+import hashlib
 import json
+import math
 import os
+import re
+import sqlite3
+import sys
+import threading
 import time
+from collections import deque
 from dataclasses import dataclass
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-# Try to import the new Gemini SDK (optional dependency)
+# Optional faster JSON codec for the LLM payload and reply
 try:
-    import google.genai as genai
+    import orjson
 except ImportError:
-    genai = None
+    orjson = None
 
 
 # =============================================================================
 # Data Model
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class NewsCase:
-    """A single news event with associated price reaction data."""
+    """
+    A single news event with associated price reaction data.
+
+    Slotted: no per-instance __dict__, so case lists stay compact and the
+    return_* field reads in the stats loops are plain descriptor lookups.
+    Frozen (and so hashable): loaded cases are shared between callers of
+    load_news_cases().
+    """
     case_id: str
     symbol: str
     event_date: str
@@ -59,24 +75,58 @@ _GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # Alternatives: gemini-1.5-flash, gemini-1.5-pro
 _GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
 
-# Rate limiting for LLM calls (timestamp of last call)
-_LAST_LLM_CALL_AT = 0.0
-_MIN_LLM_INTERVAL_SECONDS = 15.0
+
+def _env_rate(name: str, default: float) -> float:
+    """Per-minute limit from env var `name`: default if unset/unparsable, 0 (no limit) if <= 0."""
+    try:
+        value = float(os.getenv(name, default))
+    except ValueError:
+        return default
+    if not math.isfinite(value):
+        return default if value != value else 0.0  # NaN -> default, inf -> no limit
+    return max(value, 0.0)
+
+
+# Rate limiting for LLM calls: requests and (estimated) input tokens per
+# minute, each a token bucket that allows up to a minute's worth of burst.
+# Defaults: 4 RPM (one call per 15s on average), 1M TPM; 0 disables a limit
+_GEMINI_RPM = _env_rate("AI_PM_GEMINI_RPM", 4.0)
+_GEMINI_TPM = _env_rate("AI_PM_GEMINI_TPM", 1_000_000.0)
+_LLM_SLOT_LOCK = threading.Lock()
+
+# Persistent store for successful LLM patterns, keyed by model + payload
+# (can be overridden via env var; entries older than the TTL are ignored)
+_LLM_CACHE_PATH = os.getenv(
+    "PATTERN_LLM_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".pattern_cache", "llm_patterns.sqlite3"),
+)
+_LLM_CACHE_TTL_SECONDS = 24 * 3600.0
+_LLM_CACHE_LOCK = threading.Lock()
+
+# Opt-in reuse of an LLM pattern for a largely overlapping case sample
+_SEMCACHE_ENABLED = os.getenv("AI_PM_SEMCACHE", "0") == "1"
+_SEMCACHE_MIN_OVERLAP = 0.8
+_SEMCACHE: deque = deque(maxlen=256)  # (frozenset of summaries, LLM pattern)
 
 
 # =============================================================================
 # Gemini Client Wrapper
 # =============================================================================
 
+@lru_cache(maxsize=1)
 def get_gemini_client():
     """
-    Get a Gemini client instance.
+    Get the shared Gemini client instance (built on first use, then reused
+    so back-to-back pattern calls keep the same HTTP session).
 
     Raises:
         RuntimeError: If GEMINI_API_KEY not set or SDK not installed
     """
-    if genai is None:
-        raise RuntimeError("google.genai SDK not installed. pip install -U google-genai")
+    # Imported on first use: rule-based runs never load the SDK
+    try:
+        import google.genai as genai
+    except ImportError:
+        raise RuntimeError("google.genai SDK not installed. pip install -U google-genai") from None
 
     if not _GEMINI_API_KEY:
         raise RuntimeError("GEMINI_API_KEY not set")
@@ -84,6 +134,137 @@ def get_gemini_client():
     return genai.Client(api_key=_GEMINI_API_KEY)
 
 
+class _TokenBucket:
+    """Bucket of `capacity` tokens refilled continuously over one minute (per_minute <= 0: no limit)."""
+
+    __slots__ = ("capacity", "refill_per_sec", "tokens", "updated_at")
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(per_minute, 0.0)
+        self.refill_per_sec = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def wait_time(self, n: float, now: float) -> float:
+        """Seconds until n tokens are available (0.0 if they are now)."""
+        if not self.refill_per_sec:
+            return 0.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_sec)
+        self.updated_at = now
+        missing = min(n, self.capacity) - self.tokens
+        return missing / self.refill_per_sec if missing > 0 else 0.0
+
+    def take(self, n: float) -> None:
+        """Consume n tokens (after wait_time() returned 0.0)."""
+        self.tokens -= min(n, self.capacity)
+
+
+_REQUEST_BUCKET = _TokenBucket(_GEMINI_RPM)
+_TOKEN_BUCKET = _TokenBucket(_GEMINI_TPM)
+
+
+def _estimate_tokens(prompt: str) -> int:
+    """Rough input token count (~4 UTF-8 bytes per token)."""
+    return len(prompt.encode("utf-8")) // 4 + 1
+
+
+def _try_acquire_llm_slot(prompt: str = "") -> Optional[float]:
+    """
+    Claim one request plus the prompt's estimated tokens without blocking.
+
+    Returns None if both were claimed, otherwise the seconds until they
+    would be available (nothing is consumed then). Check and claim happen
+    under one lock, so concurrent callers (e.g. the app's worker threads)
+    can't overdraw the buckets.
+    """
+    tokens = _estimate_tokens(prompt)
+    with _LLM_SLOT_LOCK:
+        now = time.monotonic()
+        wait = max(_REQUEST_BUCKET.wait_time(1, now), _TOKEN_BUCKET.wait_time(tokens, now))
+        if wait > 0:
+            return wait
+        _REQUEST_BUCKET.take(1)
+        _TOKEN_BUCKET.take(tokens)
+        return None
+
+
+def reset_gemini_client() -> None:
+    """Drop the shared Gemini client; the next get_gemini_client() builds a new one."""
+    get_gemini_client.cache_clear()
+
+
+# =============================================================================
+# LLM Response Cache
+# =============================================================================
+
+# Built once: json.dumps() with non-default options makes a new encoder per call
+_CACHE_KEY_ENCODER = json.JSONEncoder(sort_keys=True, ensure_ascii=False)
+
+
+@lru_cache(maxsize=1)
+def _llm_cache_db() -> sqlite3.Connection:
+    """Shared connection to the LLM pattern store (created on first use)."""
+    os.makedirs(os.path.dirname(_LLM_CACHE_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(_LLM_CACHE_PATH, check_same_thread=False, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS llm_patterns (key TEXT PRIMARY KEY, value TEXT, ts REAL)"
+    )
+    return conn
+
+
+def _llm_cache_key(payload: List[Dict[str, Any]]) -> str:
+    """SHA1 of model name + prompt instructions + canonical payload JSON."""
+    blob = _GEMINI_MODEL + _PATTERN_PROMPT_HEADER + _CACHE_KEY_ENCODER.encode(payload)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def _llm_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Cached pattern for key, or None if missing, expired or unreadable."""
+    try:
+        with _LLM_CACHE_LOCK:
+            row = _llm_cache_db().execute(
+                "SELECT value FROM llm_patterns WHERE key = ? AND ts >= ?",
+                (key, time.time() - _LLM_CACHE_TTL_SECONDS),
+            ).fetchone()
+        if row is None:
+            return None
+        return orjson.loads(row[0]) if orjson is not None else json.loads(row[0])
+    except (sqlite3.Error, OSError, ValueError):
+        return None
+
+
+def _llm_cache_put(key: str, value: Dict[str, Any]) -> None:
+    """Store a pattern and prune expired entries; failures are ignored."""
+    now = time.time()
+    try:
+        with _LLM_CACHE_LOCK:
+            db = _llm_cache_db()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_patterns (key, value, ts) VALUES (?, ?, ?)",
+                (key, _dumps_compact(value), now),
+            )
+            db.execute(
+                "DELETE FROM llm_patterns WHERE ts < ?",
+                (now - _LLM_CACHE_TTL_SECONDS,),
+            )
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def _semcache_lookup(summaries: frozenset) -> Optional[Dict[str, Any]]:
+    """Most overlapping stored LLM pattern, if it shares enough summaries."""
+    if not summaries:
+        return None
+    best, best_overlap = None, _SEMCACHE_MIN_OVERLAP
+    with _LLM_CACHE_LOCK:
+        entries = list(_SEMCACHE)
+    for seen, pattern in entries:
+        overlap = len(summaries & seen) / max(len(summaries), len(seen))
+        if overlap >= best_overlap:
+            best, best_overlap = pattern, overlap
+    return best
+
+
 # =============================================================================
 # Data Loading
 # =============================================================================
@@ -92,18 +273,36 @@ def load_news_cases(csv_path: str | Path = "data/news_cases.csv") -> List[NewsCa
     """
     Load news cases from a CSV file.
 
+    Parsed files are memoised on (path, mtime, size): repeat calls skip the
+    parse until the file changes. Each call returns a new list, but the
+    NewsCase objects in it are shared between calls.
+
     Args:
         csv_path: Path to the CSV file (default: data/news_cases.csv)
 
     Returns:
         List of NewsCase objects
     """
-    cases: List[NewsCase] = []
     path = Path(csv_path)
 
-    if not path.exists():
+    try:
+        stat = path.stat()
+    except OSError:
         print(f"[warn] CSV file not found: {path}")
-        return cases
+        return []
+
+    return list(_load_news_cases_cached(str(path.resolve()), stat.st_mtime_ns, stat.st_size))
+
+
+@lru_cache(maxsize=8)
+def _load_news_cases_cached(path_str: str, mtime_ns: int, size: int) -> Tuple[NewsCase, ...]:
+    """Parse one version of a CSV file; mtime_ns and size only key the cache."""
+    return tuple(_parse_news_cases(Path(path_str)))
+
+
+def _parse_news_cases(path: Path) -> List[NewsCase]:
+    """Parse news cases from an existing CSV file, warning about bad rows."""
+    cases: List[NewsCase] = []
 
     with open(path, encoding="utf-8", newline="") as f:
         reader = csv.reader(f)
@@ -116,30 +315,32 @@ def load_news_cases(csv_path: str | Path = "data/news_cases.csv") -> List[NewsCa
 
         expected_cols = 10  # case_id, symbol, event_date, ..., source_tag
 
+        append = cases.append
+        strip = str.strip
+        intern = sys.intern
+
         for row_num, row in enumerate(reader, start=2):
+            # Strip every cell once, in C
+            cells = list(map(strip, row))
+
             # Skip empty rows
-            if not row or all(cell.strip() == "" for cell in row):
+            if not any(cells):
                 continue
 
             # Check column count
-            if len(row) != expected_cols:
-                print(f"[warn] skip malformed row {row_num}: expected {expected_cols} cols, got {len(row)}")
+            if len(cells) != expected_cols:
+                print(f"[warn] skip malformed row {row_num}: expected {expected_cols} cols, got {len(cells)}")
                 continue
 
             try:
-                case = NewsCase(
-                    case_id=row[0].strip(),
-                    symbol=row[1].strip(),
-                    event_date=row[2].strip(),
-                    news_headline=row[3].strip(),
-                    news_summary=row[4].strip(),
-                    return_1d=float(row[5].strip()),
-                    return_3d=float(row[6].strip()),
-                    return_7d=float(row[7].strip()),
-                    regime=row[8].strip(),
-                    source_tag=row[9].strip(),
-                )
-                cases.append(case)
+                # Columns are in NewsCase field order
+                case_id, symbol, event_date, headline, summary, r1, r3, r7, regime, source_tag = cells
+                # Low-cardinality keys: one shared str per distinct value
+                append(NewsCase(
+                    case_id, intern(symbol), event_date, headline, summary,
+                    float(r1), float(r3), float(r7),
+                    intern(regime), intern(source_tag),
+                ))
             except ValueError as e:
                 print(f"[warn] skip row {row_num} due to parse error: {e}")
                 continue
@@ -169,18 +370,96 @@ def filter_cases(
     Returns:
         Filtered list of NewsCase
     """
-    result = cases
+    if source_tag is None and regime is None:
+        if symbol is None:
+            return cases
+        # Common case: symbol only
+        return [c for c in cases if c.symbol == symbol]
+
+    # One fused pass; filters that weren't given short-circuit on `is None`
+    return [
+        c for c in cases
+        if (symbol is None or c.symbol == symbol)
+        and (source_tag is None or source_tag in c.source_tag)
+        and (regime is None or c.regime == regime)
+    ]
 
-    if symbol is not None:
-        result = [c for c in result if c.symbol == symbol]
 
-    if source_tag is not None:
-        result = [c for c in result if source_tag in c.source_tag]
+def filter_cases_by_tags(
+    cases: List[NewsCase],
+    tags: Iterable[str],
+) -> Dict[str, List[NewsCase]]:
+    """
+    Filter by several source_tag substrings in a single pass.
+
+    result[tag] equals filter_cases(cases, source_tag=tag) for every tag.
+    Each distinct source_tag is matched against the tags only once, so
+    the per-case cost is one dict lookup.
+    """
+    tags = list(dict.fromkeys(tags))
+    buckets: Dict[str, List[NewsCase]] = {tag: [] for tag in tags}
+    # source_tag -> buckets it belongs to
+    targets_by_tag: Dict[str, List[List[NewsCase]]] = {}
+
+    for c in cases:
+        targets = targets_by_tag.get(c.source_tag)
+        if targets is None:
+            targets = targets_by_tag[c.source_tag] = [
+                buckets[tag] for tag in tags if tag in c.source_tag
+            ]
+        for bucket in targets:
+            bucket.append(c)
+
+    return buckets
+
+
+@dataclass(slots=True)
+class CaseIndex:
+    """
+    Exact-match postings over a case list, built once by index_cases().
+
+    Each posting list holds the matching cases in their original order.
+    source_tag is matched by substring, so it has no index.
+    """
+    by_symbol: Dict[str, List[NewsCase]]
+    by_regime: Dict[str, List[NewsCase]]
+
 
+def index_cases(cases: List[NewsCase]) -> CaseIndex:
+    """Build symbol and regime postings for `cases` in one pass."""
+    by_symbol: Dict[str, List[NewsCase]] = {}
+    by_regime: Dict[str, List[NewsCase]] = {}
+    for c in cases:
+        by_symbol.setdefault(c.symbol, []).append(c)
+        by_regime.setdefault(c.regime, []).append(c)
+    return CaseIndex(by_symbol=by_symbol, by_regime=by_regime)
+
+
+def filter_cases_indexed(
+    cases: List[NewsCase],
+    index: CaseIndex,
+    symbol: Optional[str] = None,
+    source_tag: Optional[str] = None,
+    regime: Optional[str] = None,
+) -> List[NewsCase]:
+    """
+    Same result as filter_cases(), using `index` (built from `cases`).
+
+    Exact-match filters start from the smallest posting list, so only the
+    candidate cases are scanned for the remaining filters. Without an
+    exact-match filter this falls back to a linear scan.
+    """
+    postings = []
+    if symbol is not None:
+        postings.append(index.by_symbol.get(symbol, []))
     if regime is not None:
-        result = [c for c in result if c.regime == regime]
+        postings.append(index.by_regime.get(regime, []))
+
+    if not postings:
+        return filter_cases(cases, source_tag=source_tag)
 
-    return result
+    # At least one filter is set, so this returns a new list, never a posting
+    return filter_cases(min(postings, key=len), symbol, source_tag, regime)
 
 
 # =============================================================================
@@ -210,13 +489,30 @@ def summarize_cases(cases: List[NewsCase]) -> Dict[str, float]:
             "pos_ratio_7d": 0.0,
         }
 
-    sum_1d = sum(c.return_1d for c in cases)
-    sum_3d = sum(c.return_3d for c in cases)
-    sum_7d = sum(c.return_7d for c in cases)
+    if n == 1:
+        # Singleton: the averages are the case's own returns
+        r1, r3, r7 = cases[0].return_1d, cases[0].return_3d, cases[0].return_7d
+        return {
+            "count": 1,
+            "avg_return_1d": r1,
+            "avg_return_3d": r3,
+            "avg_return_7d": r7,
+            "pos_ratio_1d": float(r1 > 0),
+            "pos_ratio_3d": float(r3 > 0),
+            "pos_ratio_7d": float(r7 > 0),
+        }
 
-    pos_1d = sum(1 for c in cases if c.return_1d > 0)
-    pos_3d = sum(1 for c in cases if c.return_3d > 0)
-    pos_7d = sum(1 for c in cases if c.return_7d > 0)
+    # One pass: sums and positive counts for all three horizons together
+    sum_1d = sum_3d = sum_7d = 0.0
+    pos_1d = pos_3d = pos_7d = 0
+    for c in cases:
+        r1, r3, r7 = c.return_1d, c.return_3d, c.return_7d
+        sum_1d += r1
+        sum_3d += r3
+        sum_7d += r7
+        pos_1d += r1 > 0
+        pos_3d += r3 > 0
+        pos_7d += r7 > 0
 
     return {
         "count": n,
@@ -238,40 +534,38 @@ def get_symbol_stats(cases: List[NewsCase]) -> List[Dict[str, float]]:
     - count: number of cases
     - avg_return_3d: average 3-day return across those cases
     """
-    by_symbol: Dict[str, Dict[str, float]] = {}
+    # Flat per-symbol accumulators (no per-symbol record dicts)
+    counts: Dict[str, int] = {}
+    sums_3d: Dict[str, float] = {}
 
     for c in cases:
-        d = by_symbol.setdefault(c.symbol, {
-            "symbol": c.symbol,
-            "count": 0,
-            "sum_3d": 0.0,
-        })
-        d["count"] += 1
+        symbol = c.symbol
+        counts[symbol] = counts.get(symbol, 0) + 1
         # allow None but treat as 0.0
-        ret3 = c.return_3d or 0.0
-        d["sum_3d"] += ret3
-
-    stats: List[Dict[str, float]] = []
-    for s in by_symbol.values():
-        if s["count"] <= 0:
-            continue
-        stats.append({
-            "symbol": s["symbol"],
-            "count": s["count"],
-            "avg_return_3d": s["sum_3d"] / s["count"],
-        })
+        sums_3d[symbol] = sums_3d.get(symbol, 0.0) + (c.return_3d or 0.0)
 
     # sort by symbol for deterministic baseline ordering
-    stats.sort(key=lambda x: x["symbol"])
-    return stats
+    return [
+        {
+            "symbol": symbol,
+            "count": counts[symbol],
+            "avg_return_3d": sums_3d[symbol] / counts[symbol],
+        }
+        for symbol in sorted(counts)
+    ]
 
 
 # =============================================================================
 # Pretty Print
 # =============================================================================
 
+# Sort key for listing cases chronologically
+_BY_DATE = attrgetter("event_date")
+
+
+@lru_cache(maxsize=4096)
 def _format_pct(value: float) -> str:
-    """Format a decimal return as a percentage string with sign."""
+    """Format a decimal return as a percentage string with sign (memoised per value)."""
     pct = value * 100
     if pct >= 0:
         return f"+{pct:.1f}%"
@@ -283,6 +577,7 @@ def print_pretty_report(
     title: str,
     cases: List[NewsCase],
     summary: Dict[str, float],
+    presorted: bool = False,
 ) -> None:
     """
     Print a formatted report of news cases and summary statistics.
@@ -291,65 +586,81 @@ def print_pretty_report(
         title: Report title (e.g., symbol name)
         cases: List of NewsCase to display
         summary: Summary statistics from summarize_cases()
+        presorted: True if `cases` is already in event_date order
     """
+    lines: List[str] = []  # Emitted with one print at the end
     count = int(summary.get("count", len(cases)))
 
     # Header
-    print()
-    print(f"{'=' * 60}")
-    print(f"  News Replay: {title} (样本 {count} 条)")
-    print(f"{'=' * 60}")
-    print()
+    lines.append("")
+    lines.append(f"{'=' * 60}")
+    lines.append(f"  News Replay: {title} (样本 {count} 条)")
+    lines.append(f"{'=' * 60}")
+    lines.append("")
 
     if count == 0:
-        print("  (无匹配数据)")
-        print()
+        lines.append("  (无匹配数据)")
+        lines.append("")
+        print("\n".join(lines))
         return
 
     # Sort cases by date ascending
-    sorted_cases = sorted(cases, key=lambda c: c.event_date)
+    sorted_cases = cases if presorted else sorted(cases, key=_BY_DATE)
 
     # List each case
     for i, case in enumerate(sorted_cases, start=1):
-        print(f"{i}) {case.event_date}  {case.news_headline}")
-        print(f"   Regime: {case.regime}  | Tag: {case.source_tag}")
-        print(f"   1D: {_format_pct(case.return_1d)}, "
-              f"3D: {_format_pct(case.return_3d)}, "
-              f"7D: {_format_pct(case.return_7d)}")
+        lines.append(f"{i}) {case.event_date}  {case.news_headline}")
+        lines.append(f"   Regime: {case.regime}  | Tag: {case.source_tag}")
+        lines.append(f"   1D: {_format_pct(case.return_1d)}, "
+                     f"3D: {_format_pct(case.return_3d)}, "
+                     f"7D: {_format_pct(case.return_7d)}")
         # Truncate summary if too long
         summary_text = case.news_summary
         if len(summary_text) > 80:
             summary_text = summary_text[:77] + "..."
-        print(f"   摘要: {summary_text}")
-        print()
+        lines.append(f"   摘要: {summary_text}")
+        lines.append("")
 
     # Summary block
-    print("-" * 60)
-    print("整体统计：")
-    print(f"  - 1日平均涨幅: {_format_pct(summary['avg_return_1d'])} "
-          f"(上涨占比 {summary['pos_ratio_1d'] * 100:.0f}%)")
-    print(f"  - 3日平均涨幅: {_format_pct(summary['avg_return_3d'])} "
-          f"(上涨占比 {summary['pos_ratio_3d'] * 100:.0f}%)")
-    print(f"  - 7日平均涨幅: {_format_pct(summary['avg_return_7d'])} "
-          f"(上涨占比 {summary['pos_ratio_7d'] * 100:.0f}%)")
-    print()
+    lines.append("-" * 60)
+    lines.append("整体统计：")
+    lines.append(f"  - 1日平均涨幅: {_format_pct(summary['avg_return_1d'])} "
+                 f"(上涨占比 {summary['pos_ratio_1d'] * 100:.0f}%)")
+    lines.append(f"  - 3日平均涨幅: {_format_pct(summary['avg_return_3d'])} "
+                 f"(上涨占比 {summary['pos_ratio_3d'] * 100:.0f}%)")
+    lines.append(f"  - 7日平均涨幅: {_format_pct(summary['avg_return_7d'])} "
+                 f"(上涨占比 {summary['pos_ratio_7d'] * 100:.0f}%)")
+    lines.append("")
+    print("\n".join(lines))
 
 
 # =============================================================================
 # Pattern Analysis (Rule-Based + Optional LLM)
 # =============================================================================
 
-def _analyze_pattern_rule_based(cases: List[NewsCase]) -> dict:
+@lru_cache(maxsize=None)
+def _pattern_name_for_tag(source_tag: str) -> str:
+    """Pattern name for a source tag: the part after the first "_" (memoised; tags are a small set)."""
+    _, sep, rest = source_tag.partition("_")
+    return rest if sep else source_tag
+
+
+def _analyze_pattern_rule_based(
+    cases: List[NewsCase],
+    summary: Optional[Dict[str, float]] = None,
+) -> dict:
     """
     Analyze historical news pattern using rule-based logic.
 
     Args:
         cases: List of NewsCase to analyze
+        summary: summarize_cases(cases), if the caller already has it
 
     Returns:
         Dict with pattern analysis
     """
-    summary = summarize_cases(cases)
+    if summary is None:
+        summary = summarize_cases(cases)
     count = int(summary.get("count", 0))
 
     if count == 0:
@@ -398,15 +709,7 @@ def _analyze_pattern_rule_based(cases: List[NewsCase]) -> dict:
         typical_horizon = "1d"
 
     # Infer pattern name
-    if cases:
-        first_tag = cases[0].source_tag
-        parts = first_tag.split("_")
-        if len(parts) >= 2:
-            pattern_name = "_".join(parts[1:])
-        else:
-            pattern_name = first_tag
-    else:
-        pattern_name = "generic_pattern"
+    pattern_name = _pattern_name_for_tag(cases[0].source_tag) if cases else "generic_pattern"
 
     # Build comment
     avg_3d_pct = summary["avg_return_3d"] * 100
@@ -429,11 +732,208 @@ def _analyze_pattern_rule_based(cases: List[NewsCase]) -> dict:
     }
 
 
+@lru_cache(maxsize=1024)
+def _rule_based_pattern_cached(sample_cases: Tuple[NewsCase, ...]) -> dict:
+    """Rule-based pattern memoised per case sample (NewsCase is frozen, so hashable)."""
+    return _analyze_pattern_rule_based(list(sample_cases))
+
+
+def _rule_based_pattern_copy(sample_cases: List[NewsCase]) -> dict:
+    """Fresh copy of the memoised rule-based pattern, safe for callers to modify."""
+    return dict(_rule_based_pattern_cached(tuple(sample_cases)))
+
+
+# Opening ```lang / closing ``` fence around a model reply
+_CODE_FENCE_RE = re.compile(r"\A```[\w-]*|```\Z")
+_JSON_DECODER = json.JSONDecoder()
+_COMPACT_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _dumps_compact(obj: Any) -> str:
+    """Compact JSON with non-ASCII kept as-is (orjson if installed)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return _COMPACT_ENCODER.encode(obj)
+
+
+def _loads_reply(text: str) -> Any:
+    """
+    Parse the first JSON value in a model reply.
+
+    orjson handles the common all-JSON reply; replies with trailing text
+    (or orjson missing) go through JSONDecoder.raw_decode.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return _JSON_DECODER.raw_decode(text)[0]
+
+
+# Field list shared by the single-group and batched pattern prompts
+_PATTERN_PROMPT_FIELDS = """每个样本包含：
+* 新闻摘要 summary
+* 1日/3日/7日收益 return_1d/return_3d/return_7d
+* 可选的 regime（trending/ranging 等）
+
+请你输出一个 JSON，字段为：
+* pattern_name: 概括这种新闻类型的名字（用简短中文，例如 "广告_利好"）
+* avg_return_1d: 过去样本的 1 日平均收益（小数，例如 0.12 表示 +12%）
+* avg_return_3d: 3 日平均收益
+* avg_return_7d: 7 日平均收益
+* confidence_level: "high" / "medium" / "low"
+* typical_horizon: "1d" / "3d" / "7d" 中选一个你认为反应最强的周期
+* comment: 用一两句中文解释这个模式的含义
+
+"""
+
+# Fixed instructions for the pattern prompt; the case payload JSON is appended
+_PATTERN_PROMPT_HEADER = (
+    "你是一个事件驱动交易员。\n"
+    "下面是同一类新闻的若干历史样本，请你总结这种新闻大致的价格反应模式。\n\n"
+    + _PATTERN_PROMPT_FIELDS
+    + "只输出严格的 JSON，不要解释文字。\n\n"
+    "历史样本 JSON 列表如下：\n"
+)
+
+# Batched variant: payload is {group name: [cases]}, reply is {group name: pattern}
+_PATTERN_BATCH_PROMPT_HEADER = (
+    "你是一个事件驱动交易员。\n"
+    "下面是若干组新闻的历史样本（JSON 对象，键为组名，值为该组的样本列表），"
+    "请你分别总结每一组新闻大致的价格反应模式。\n\n"
+    + _PATTERN_PROMPT_FIELDS
+    + "请把每一组的结果放进一个 JSON 对象，键为原组名，值为上述字段的 JSON。\n"
+    "只输出严格的 JSON，不要解释文字。\n\n"
+    "历史样本 JSON 对象如下：\n"
+)
+
+
+def _case_payload(cases: List[NewsCase]) -> List[Dict[str, Any]]:
+    """Per-case dicts sent to the LLM (also the cache key input)."""
+    return [
+        {
+            "symbol": c.symbol,
+            "event_date": c.event_date,
+            "summary": c.news_summary,
+            "regime": c.regime,
+            "return_1d": round(c.return_1d, 4),
+            "return_3d": round(c.return_3d, 4),
+            "return_7d": round(c.return_7d, 4),
+        }
+        for c in cases
+    ]
+
+
+def _call_gemini(prompt: str) -> str:
+    """Send one prompt; return the reply text without a surrounding code fence."""
+    client = get_gemini_client()
+
+    # Call Gemini API with new SDK
+    response = client.models.generate_content(
+        model=_GEMINI_MODEL,
+        contents=prompt,
+    )
+
+    # Extract text from response - handle different response structures
+    if hasattr(response, 'text'):
+        text = response.text
+    elif hasattr(response, 'candidates') and response.candidates:
+        text = response.candidates[0].content.parts[0].text
+    else:
+        raise RuntimeError("Unexpected Gemini response structure")
+
+    return _CODE_FENCE_RE.sub("", text.strip()).strip()
+
+
+def _pattern_from_llm(data: Dict[str, Any], rb: dict, text: str) -> dict:
+    """Pattern dict from the LLM's fields, with gaps filled from the rule-based one."""
+    pattern = {
+        "pattern_name": data.get("pattern_name") or rb.get("pattern_name") or "未知模式",
+        "avg_return_1d": data.get("avg_return_1d", rb.get("avg_return_1d")),
+        "avg_return_3d": data.get("avg_return_3d", rb.get("avg_return_3d")),
+        "avg_return_7d": data.get("avg_return_7d", rb.get("avg_return_7d")),
+        "confidence": rb.get("confidence", 0.5),  # Keep rule-based confidence
+        "confidence_level": data.get("confidence_level", "low"),
+        "typical_horizon": data.get("typical_horizon", rb.get("typical_horizon", "3d")),
+        "analysis_method": "llm",
+        "comment": data.get("comment", rb.get("comment", "")),
+        "raw_llm_text": text,
+        "note": f"LLM analysis via {_GEMINI_MODEL} succeeded. This summary is based on LLM reasoning.",
+        "error": None,
+        "llm_model": _GEMINI_MODEL,  # Track which model was used
+    }
+
+    # Validate confidence_level
+    if pattern["confidence_level"] not in {"low", "medium", "high"}:
+        pattern["confidence_level"] = "low"
+
+    # Validate typical_horizon
+    if pattern["typical_horizon"] not in {"1d", "3d", "7d"}:
+        pattern["typical_horizon"] = "3d"
+
+    return pattern
+
+
+def _llm_error_note(e: Exception) -> str:
+    """Short user-facing note for a failed LLM call."""
+    error_msg = str(e)[:120]
+
+    # Map common errors to user-friendly messages
+    if "404" in error_msg or "NOT_FOUND" in error_msg:
+        return f"LLM error: Model not available (404). Falling back to rule-based. Error: {error_msg}"
+    if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg or "quota" in error_msg.lower():
+        return f"LLM error: Quota/rate limit (429 RESOURCE_EXHAUSTED). Falling back to rule-based. Error: {error_msg}"
+    if "network" in error_msg.lower() or "connection" in error_msg.lower():
+        return f"LLM error: Network issue. Falling back to rule-based. Error: {error_msg}"
+    return f"LLM error: {error_msg}. Falling back to rule-based."
+
+
+def _rate_limited_note(wait: float) -> str:
+    """Note for a call skipped because the rate-limit budget was used up."""
+    limits = " / ".join(f"{limit:.0f} {unit}" for limit, unit in ((_GEMINI_RPM, "RPM"), (_GEMINI_TPM, "TPM")) if limit)
+    return f"LLM call skipped to respect rate limits (next slot in {wait:.1f}s, limits: {limits}). Using rule-based pattern."
+
+
+def _cached_llm_pattern(cache_key: str, sample_cases: List[NewsCase], rb: dict) -> Optional[dict]:
+    """Stored LLM pattern for this payload (or, with AI_PM_SEMCACHE=1, a similar one)."""
+    cached = _llm_cache_get(cache_key)
+    if cached is not None:
+        cached["note"] = f"LLM analysis via {cached.get('llm_model', _GEMINI_MODEL)} (served from local cache)."
+        return cached
+
+    # Reuse the LLM reading of a near-identical sample; the averages still
+    # come from this sample's rule-based numbers
+    if _SEMCACHE_ENABLED:
+        similar = _semcache_lookup(frozenset(c.news_summary for c in sample_cases))
+        if similar is not None:
+            pattern = dict(similar)
+            for key in ("avg_return_1d", "avg_return_3d", "avg_return_7d", "confidence"):
+                pattern[key] = rb.get(key)
+            pattern["note"] = f"LLM analysis via {pattern.get('llm_model', _GEMINI_MODEL)} reused from a similar case set."
+            pattern["semcache"] = True  # Borrowed, not an answer for this sample: never persisted
+            return pattern
+
+    return None
+
+
+def _remember_llm_pattern(cache_key: str, sample_cases: List[NewsCase], pattern: dict) -> None:
+    """Record a successful LLM pattern for _cached_llm_pattern() (semantic-cache hits are skipped)."""
+    if pattern.get("semcache"):
+        return
+    _llm_cache_put(cache_key, pattern)
+    if _SEMCACHE_ENABLED:
+        summaries = frozenset(c.news_summary for c in sample_cases)
+        with _LLM_CACHE_LOCK:
+            _SEMCACHE.append((summaries, dict(pattern)))
+
+
 def analyze_pattern_with_llm(
     cases: List[NewsCase],
     *,
     force_llm: bool = False,
     max_cases: int = 5,
+    summary: Optional[Dict[str, float]] = None,
 ) -> dict:
     """
     Analyze historical news pattern, optionally using LLM.
@@ -449,6 +949,9 @@ def analyze_pattern_with_llm(
         force_llm: If True, attempt to use LLM (requires AI_PM_USE_LLM env var)
                    If False (default), always use rule-based analysis
         max_cases: Maximum number of cases to send to LLM (default: 5)
+        summary: summarize_cases(cases), if the caller already has it.
+                 Reused for the rule-based baseline when all cases fit
+                 in the sample; otherwise the sample is summarized.
 
     Returns:
         Dict with pattern analysis:
@@ -467,17 +970,21 @@ def analyze_pattern_with_llm(
             "error": Optional[str],
         }
     """
-    global _LAST_LLM_CALL_AT
-
     # 0) If no cases, return empty pattern
     if not cases:
-        return _analyze_pattern_rule_based(cases)
+        return _analyze_pattern_rule_based(cases, summary)
 
     # 1) Limit sample size to avoid token limits
     sample_cases = cases[:max_cases]
+    if len(sample_cases) < len(cases):
+        summary = None  # Caller's summary covers more than the sample
 
-    # 2) Get rule-based result as baseline/fallback
-    rb = _analyze_pattern_rule_based(sample_cases)
+    # 2) Get rule-based result as baseline/fallback (a fresh copy of the
+    #    memoised one, unless the caller already has the summary)
+    if summary is not None:
+        rb = _analyze_pattern_rule_based(sample_cases, summary)
+    else:
+        rb = _rule_based_pattern_copy(sample_cases)
 
     # 3) Check if AI_PM_USE_LLM is set
     if not _USE_LLM_DEFAULT:
@@ -500,129 +1007,139 @@ def analyze_pattern_with_llm(
         rb["error"] = None
         return rb
 
-    # 6) Rate limiting check
-    now = time.time()
-    elapsed = now - _LAST_LLM_CALL_AT
-    if _LAST_LLM_CALL_AT > 0 and elapsed < _MIN_LLM_INTERVAL_SECONDS:
+    # 6) Serve a stored result for the same model + payload, if still fresh
+    payload = _case_payload(sample_cases)
+    cache_key = _llm_cache_key(payload)
+    cached = _cached_llm_pattern(cache_key, sample_cases, rb)
+    if cached is not None:
+        return cached
+
+    # 7) Rate limiting: claim a request + the prompt's tokens, or fall back
+    #    without waiting. Prompt: fixed instructions + compact JSON payload
+    prompt = _PATTERN_PROMPT_HEADER + _dumps_compact(payload)
+    wait = _try_acquire_llm_slot(prompt)
+    if wait is not None:
         rb["analysis_method"] = "rule_based_fallback"
-        rb["note"] = f"LLM call skipped to respect rate limits (last call was {elapsed:.1f}s ago, min interval: {_MIN_LLM_INTERVAL_SECONDS}s). Using rule-based pattern."
+        rb["note"] = _rate_limited_note(wait)
         rb["error"] = None
         return rb
 
-    # 7) Try LLM path (force_llm=True and all checks passed)
+    # 8) Try LLM path (force_llm=True and all checks passed)
     try:
-        client = get_gemini_client()
-
-        # Build payload - limit to max_cases to avoid token limits
-        payload = [
-            {
-                "symbol": c.symbol,
-                "event_date": c.event_date,
-                "summary": c.news_summary,
-                "regime": c.regime,
-                "return_1d": round(c.return_1d, 4),
-                "return_3d": round(c.return_3d, 4),
-                "return_7d": round(c.return_7d, 4),
-            }
-            for c in sample_cases
-        ]
-
-        # Build prompt
-        prompt = f"""你是一个事件驱动交易员。
-下面是同一类新闻的若干历史样本，请你总结这种新闻大致的价格反应模式。
-
-每个样本包含：
-* 新闻摘要 summary
-* 1日/3日/7日收益 return_1d/return_3d/return_7d
-* 可选的 regime（trending/ranging 等）
+        # Parse the first JSON value of the reply (tolerates trailing
+        # chatter after the object)
+        text = _call_gemini(prompt)
+        pattern = _pattern_from_llm(_loads_reply(text), rb, text)
+        _remember_llm_pattern(cache_key, sample_cases, pattern)
+        return pattern
 
-请你输出一个 JSON，字段为：
-* pattern_name: 概括这种新闻类型的名字（用简短中文，例如 "广告_利好"）
-* avg_return_1d: 过去样本的 1 日平均收益（小数，例如 0.12 表示 +12%）
-* avg_return_3d: 3 日平均收益
-* avg_return_7d: 7 日平均收益
-* confidence_level: "high" / "medium" / "low"
-* typical_horizon: "1d" / "3d" / "7d" 中选一个你认为反应最强的周期
-* comment: 用一两句中文解释这个模式的含义
+    except Exception as e:
+        # Fast fallback on any error - keep error message concise and user-friendly
+        rb["analysis_method"] = "rule_based_fallback"
+        rb["note"] = _llm_error_note(e)
+        rb["error"] = None
+        return rb
 
-只输出严格的 JSON，不要解释文字。
 
-历史样本 JSON 列表如下：
-{json.dumps(payload, ensure_ascii=False, indent=2)}
-"""
+def analyze_patterns_with_llm_batch(
+    groups: Dict[str, List[NewsCase]],
+    *,
+    force_llm: bool = False,
+    max_cases: int = 5,
+) -> Dict[str, dict]:
+    """
+    analyze_pattern_with_llm() for several case groups with one Gemini call.
 
-        # Update rate limit timestamp before call
-        _LAST_LLM_CALL_AT = now
+    Groups already in the LLM cache are served from it; the rest go out in
+    a single request (one rate-limit request slot for the whole batch) that asks for
+    a JSON object of patterns keyed by group name. A group missing from the
+    reply, or any error, falls back to its rule-based pattern.
 
-        # Call Gemini API with new SDK
-        response = client.models.generate_content(
-            model=_GEMINI_MODEL,
-            contents=prompt,
-        )
+    Args:
+        groups: Group name -> cases (e.g. one entry per symbol or tag)
+        force_llm: As for analyze_pattern_with_llm()
+        max_cases: Maximum number of cases per group sent to the LLM
 
-        # Extract text from response - handle different response structures
-        if hasattr(response, 'text'):
-            text = response.text
-        elif hasattr(response, 'candidates') and response.candidates:
-            text = response.candidates[0].content.parts[0].text
-        else:
-            raise RuntimeError("Unexpected Gemini response structure")
-
-        text = text.strip()
-
-        # Handle markdown code blocks
-        if text.startswith("```"):
-            lines = text.split("\n")
-            json_lines = [l for l in lines if not l.startswith("```")]
-            text = "\n".join(json_lines).strip()
-
-        data = json.loads(text)
-
-        # Build result from LLM data with fallback to rule-based
-        pattern = {
-            "pattern_name": data.get("pattern_name") or rb.get("pattern_name") or "未知模式",
-            "avg_return_1d": data.get("avg_return_1d", rb.get("avg_return_1d")),
-            "avg_return_3d": data.get("avg_return_3d", rb.get("avg_return_3d")),
-            "avg_return_7d": data.get("avg_return_7d", rb.get("avg_return_7d")),
-            "confidence": rb.get("confidence", 0.5),  # Keep rule-based confidence
-            "confidence_level": data.get("confidence_level", "low"),
-            "typical_horizon": data.get("typical_horizon", rb.get("typical_horizon", "3d")),
-            "analysis_method": "llm",
-            "comment": data.get("comment", rb.get("comment", "")),
-            "raw_llm_text": text,
-            "note": f"LLM analysis via {_GEMINI_MODEL} succeeded. This summary is based on LLM reasoning.",
-            "error": None,
-            "llm_model": _GEMINI_MODEL,  # Track which model was used
+    Returns:
+        Group name -> pattern dict, in the order of `groups`
+    """
+    # Without an LLM call to share, each group takes the single-group path
+    if not (force_llm and _USE_LLM_DEFAULT and _GEMINI_API_KEY):
+        return {
+            name: analyze_pattern_with_llm(cases, force_llm=force_llm, max_cases=max_cases)
+            for name, cases in groups.items()
         }
 
-        # Validate confidence_level
-        if pattern["confidence_level"] not in {"low", "medium", "high"}:
-            pattern["confidence_level"] = "low"
-
-        # Validate typical_horizon
-        if pattern["typical_horizon"] not in {"1d", "3d", "7d"}:
-            pattern["typical_horizon"] = "3d"
-
-        return pattern
+    results: Dict[str, dict] = {}
+    pending: Dict[str, Tuple[List[NewsCase], dict, str, List[Dict[str, Any]]]] = {}
+    for name, cases in groups.items():
+        if not cases:
+            results[name] = _analyze_pattern_rule_based(cases)
+            continue
+        sample_cases = cases[:max_cases]
+        rb = _rule_based_pattern_copy(sample_cases)
+        payload = _case_payload(sample_cases)
+        cache_key = _llm_cache_key(payload)
+        cached = _cached_llm_pattern(cache_key, sample_cases, rb)
+        if cached is not None:
+            results[name] = cached
+        else:
+            pending[name] = (sample_cases, rb, cache_key, payload)
 
-    except Exception as e:
-        # Fast fallback on any error - keep error message concise and user-friendly
-        error_msg = str(e)[:120]
-
-        # Map common errors to user-friendly messages
-        if "404" in error_msg or "NOT_FOUND" in error_msg:
-            user_msg = f"LLM error: Model not available (404). Falling back to rule-based. Error: {error_msg}"
-        elif "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg or "quota" in error_msg.lower():
-            user_msg = f"LLM error: Quota/rate limit (429 RESOURCE_EXHAUSTED). Falling back to rule-based. Error: {error_msg}"
-        elif "network" in error_msg.lower() or "connection" in error_msg.lower():
-            user_msg = f"LLM error: Network issue. Falling back to rule-based. Error: {error_msg}"
+    if pending:
+        prompt = _PATTERN_BATCH_PROMPT_HEADER + _dumps_compact(
+            {name: entry[3] for name, entry in pending.items()}
+        )
+        wait = _try_acquire_llm_slot(prompt)
+        if wait is not None:
+            note, replies = _rate_limited_note(wait), {}
         else:
-            user_msg = f"LLM error: {error_msg}. Falling back to rule-based."
+            try:
+                text = _call_gemini(prompt)
+                replies = _loads_reply(text)
+                if not isinstance(replies, dict):
+                    raise ValueError("batch reply is not a JSON object")
+                note = f"LLM batch reply from {_GEMINI_MODEL} had no entry for this group. Falling back to rule-based."
+            except Exception as e:
+                note, replies = _llm_error_note(e), {}
+
+        for name, (sample_cases, rb, cache_key, _) in pending.items():
+            data = replies.get(name)
+            if isinstance(data, dict):
+                pattern = _pattern_from_llm(data, rb, text)
+                pattern["note"] = f"LLM analysis via {_GEMINI_MODEL} succeeded (batched with {len(pending)} groups). This summary is based on LLM reasoning."
+                _remember_llm_pattern(cache_key, sample_cases, pattern)
+                results[name] = pattern
+            else:
+                rb["analysis_method"] = "rule_based_fallback"
+                rb["note"] = note
+                rb["error"] = None
+                results[name] = rb
+
+    return {name: results[name] for name in groups}
+
+
+def analyze_cases(
+    cases: List[NewsCase],
+    *,
+    force_llm: bool = False,
+    max_cases: int = 5,
+) -> Tuple[Dict[str, float], dict]:
+    """
+    Summary statistics and historical pattern for the same cases.
 
-        rb["analysis_method"] = "rule_based_fallback"
-        rb["note"] = user_msg
-        rb["error"] = None
-        return rb
+    Equivalent to calling summarize_cases() and analyze_pattern_with_llm(),
+    but the rule-based pattern reuses the summary instead of walking the
+    cases again.
+
+    Returns:
+        (summary, pattern)
+    """
+    summary = summarize_cases(cases)
+    pattern = analyze_pattern_with_llm(
+        cases, force_llm=force_llm, max_cases=max_cases, summary=summary
+    )
+    return summary, pattern
 
 
 # =============================================================================
@@ -637,23 +1154,27 @@ def main() -> None:
         print("No news cases loaded. Check data/news_cases.csv")
         return
 
+    # Reports list cases by date: sort once, and filtering keeps the order
+    cases = sorted(cases, key=_BY_DATE)
+    index = index_cases(cases)
+
     # Demo 1: Filter by symbol
     symbol = "BLUE"
-    filtered = filter_cases(cases, symbol=symbol)
+    filtered = filter_cases_indexed(cases, index, symbol=symbol)
     summary = summarize_cases(filtered)
-    print_pretty_report(symbol, filtered, summary)
+    print_pretty_report(symbol, filtered, summary, presorted=True)
 
     # Demo 2: Filter by source_tag substring (Crypto)
     tag = "Crypto"
-    filtered = filter_cases(cases, source_tag=tag)
+    filtered = filter_cases_indexed(cases, index, source_tag=tag)
     summary = summarize_cases(filtered)
-    print_pretty_report(f"Tag: {tag}", filtered, summary)
+    print_pretty_report(f"Tag: {tag}", filtered, summary, presorted=True)
 
     # Demo 3: Filter by regime
     regime = "trending"
-    filtered = filter_cases(cases, regime=regime)
+    filtered = filter_cases_indexed(cases, index, regime=regime)
     summary = summarize_cases(filtered)
-    print_pretty_report(f"Regime: {regime}", filtered, summary)
+    print_pretty_report(f"Regime: {regime}", filtered, summary, presorted=True)
 
 
 if __name__ == "__main__":
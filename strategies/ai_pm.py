@@ -44,6 +44,7 @@ Environment variables:
 import json
 import os
 from collections import deque
+from functools import lru_cache
 from typing import Any, Dict, Optional
 
 # Try to import the new Gemini SDK (optional dependency)
@@ -82,9 +83,11 @@ VALID_RISK_MODES = {"defensive", "normal", "aggressive"}
 # Gemini Client Wrapper
 # =============================================================================
 
+@lru_cache(maxsize=1)
 def get_gemini_client():
     """
-    Get a Gemini client instance.
+    Get the shared Gemini client instance (built on first use, then reused
+    so consecutive LLM decisions keep the same HTTP connection pool).
 
     Raises:
         RuntimeError: If GEMINI_API_KEY not set or SDK not installed
@@ -98,6 +101,11 @@ def get_gemini_client():
     return genai.Client(api_key=GEMINI_API_KEY)
 
 
+def reset_gemini_client() -> None:
+    """Drop the shared Gemini client; the next get_gemini_client() builds a new one."""
+    get_gemini_client.cache_clear()
+
+
 # =============================================================================
 # AI Portfolio Manager Class (Rule-Based Engine)
 # =============================================================================
@@ -11,11 +11,14 @@ from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class OrderInstruction:
     """
     A single order instruction generated by a strategy.
 
+    Slotted (no per-instance __dict__): strategies emit one or more of these
+    per tick, so long backtests allocate many of them.
+
     Strategies produce these instructions; the router/executor decides
     whether and how to execute them.
 
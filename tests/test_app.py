@@ -0,0 +1,113 @@
+# tests/test_app.py
+"""
+Pytest-style tests for the Streamlit app's helpers.
+
+Skipped when streamlit/pandas are not installed (the app's own dependencies).
+"""
+
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+import app
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+def _done(pattern=None, exc=None):
+    """Finished Future holding `pattern` (or raising `exc`)."""
+    future = Future()
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(pattern)
+    return future
+
+
+class _FakePool:
+    """Executor stand-in that records submissions and returns a pending Future."""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, fn, *args, **kwargs):
+        self.calls.append((fn, args, kwargs))
+        return Future()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    fake = _FakePool()
+    monkeypatch.setattr(app.st, "session_state", {})
+    monkeypatch.setattr(app, "_llm_pool", lambda: fake)
+    return fake
+
+
+# =============================================================================
+# Gemini Submission Tests
+# =============================================================================
+
+class TestSubmitLLMPattern:
+    """Tests for _submit_llm_pattern's submit/retry rules."""
+
+    KEY = ("BTC", ("c1", "c2"))
+
+    def test_first_request_submits(self, pool):
+        app._submit_llm_pattern(self.KEY, [])
+        assert pool.calls == [(app.analyze_pattern_with_llm, ([],), {"force_llm": True})]
+
+    def test_running_call_is_not_resubmitted(self, pool):
+        app._submit_llm_pattern(self.KEY, [])
+        app._submit_llm_pattern(self.KEY, [])
+        assert len(pool.calls) == 1
+
+    def test_llm_result_is_kept(self, pool):
+        app.st.session_state["pending_patterns"] = {self.KEY: _done({"analysis_method": "llm"})}
+        app._submit_llm_pattern(self.KEY, [])
+        assert pool.calls == []
+
+    @pytest.mark.parametrize("future", [
+        _done({"analysis_method": "rule_based_fallback", "note": "rate limit"}),
+        _done(exc=RuntimeError("boom")),
+    ])
+    def test_failed_call_is_retried(self, pool, future):
+        app.st.session_state["pending_patterns"] = {self.KEY: future}
+        app._submit_llm_pattern(self.KEY, [])
+        assert len(pool.calls) == 1
+        assert app.st.session_state["pending_patterns"][self.KEY] is not future
+
+
+class TestRerunWhenLLMLands:
+    """Tests for _rerun_when_llm_lands: only the shown pattern's call is waited on."""
+
+    KEY = ("BTC", ("c1", "c2"))
+
+    @pytest.fixture
+    def reruns(self, monkeypatch):
+        waited, reruns = [], []
+        monkeypatch.setattr(app.st, "session_state", {})
+        monkeypatch.setattr(app, "wait", lambda futures, timeout: waited.extend(futures))
+        monkeypatch.setattr(app.st, "rerun", lambda scope: reruns.append(scope))
+        return SimpleNamespace(waited=waited, scopes=reruns)
+
+    def test_waits_on_the_shown_pattern_only(self, reruns):
+        shown, other = Future(), Future()
+        app.st.session_state["pending_patterns"] = {self.KEY: shown, ("TSLA", ("c3",)): other}
+        app._rerun_when_llm_lands(self.KEY)
+        assert reruns.waited == [shown]
+        assert reruns.scopes == ["fragment"]
+
+    @pytest.mark.parametrize("key", [None, ("BTC", ("c1",)), KEY])
+    def test_no_rerun_for_other_or_finished_calls(self, reruns, key):
+        app.st.session_state["pending_patterns"] = {
+            self.KEY: _done({"analysis_method": "llm"}),
+            ("TSLA", ("c3",)): Future(),
+        }
+        app._rerun_when_llm_lands(key)
+        assert reruns.waited == [] and reruns.scopes == []
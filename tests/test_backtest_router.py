@@ -98,6 +98,7 @@ class TestBacktestResult:
         series = [arb_tick, sniper_tick]
         result = engine.run(series)
         # BacktestEngine records equity after each tick (not before)
+        assert isinstance(result.equity_curve, list)
         assert len(result.equity_curve) == len(series)
 
     def test_result_has_trades_list(self, engine, arb_tick):
@@ -198,6 +199,55 @@ class TestEquityTracking:
         expected_return = (result.final_equity - result.initial_cash) / result.initial_cash
         assert abs(result.total_return - expected_return) < 0.0001
 
+    def test_max_drawdown_is_worst_peak_to_trough(self):
+        """max_drawdown is the largest decline from the running peak (seeded with initial cash)."""
+        engine = BacktestEngine(SniperStrategy(target_price=0.50, min_gap=0.02), initial_cash=1000.0)
+        series = [
+            {"best_ask": 0.40, "best_bid": 0.39},   # Buy
+            {"best_ask": 0.30, "best_bid": 0.29},   # Mark drops
+            {"best_ask": 0.45, "best_bid": 0.44},   # Recovers
+        ]
+        result = engine.run(series)
+
+        peak, expected = result.initial_cash, 0.0
+        for equity in result.equity_curve:
+            peak = max(peak, equity)
+            expected = max(expected, (peak - equity) / peak)
+        assert expected > 0
+        assert result.max_drawdown == pytest.approx(expected)
+
+    def test_max_drawdown_zero_without_data(self, engine):
+        """An empty run has no drawdown."""
+        assert engine.run([]).max_drawdown == 0.0
+
+    def test_mark_prices_with_mixed_quote_layouts(self, engine, arb_tick, sniper_tick):
+        """Ticks that differ from the first tick's layout are still marked correctly."""
+        series = [
+            sniper_tick,
+            arb_tick,
+            {"mid_price": 0.47},
+            {"price": 0.52},
+            {"best_bid": 0.0, "best_ask": 0.40, "op_bid": 0.38},
+        ]
+        mark_price = engine._mark_price_getter(series[0])
+        assert [mark_price(tick) for tick in series] == pytest.approx([0.395, 0.495, 0.47, 0.52, 0.39])
+
+    def test_marks_only_looked_up_while_holding(self, monkeypatch, sniper_tick, no_opportunity_tick):
+        """Ticks that end flat are valued at cash without a mark-price lookup."""
+        engine = BacktestEngine(SniperStrategy(target_price=0.50, min_gap=0.02), initial_cash=1000.0)
+        marked = []
+
+        def mark_price(market_state):
+            marked.append(market_state)
+            return 0.40
+
+        monkeypatch.setattr(engine, "_mark_price_getter", lambda first_tick: mark_price)
+        series = [no_opportunity_tick, no_opportunity_tick, sniper_tick, no_opportunity_tick]
+        result = engine.run(series)
+
+        assert marked == [sniper_tick, no_opportunity_tick]
+        assert result.equity_curve[:2] == [1000.0, 1000.0]
+
 
 # =============================================================================
 # Standalone Strategy Tests
@@ -221,3 +271,19 @@ class TestBacktestWithStandaloneStrategies:
         result = engine.run([sniper_tick])
         assert result.strategy_name == "sniper_direct"
         assert result.total_trades == 1
+
+    def test_reset_swaps_strategy_and_keeps_earlier_results(self, arb_tick, sniper_tick):
+        """reset(strategy) reuses one engine without disturbing earlier results."""
+        engine = BacktestEngine(strategy=OUArbStrategy(name="ou_direct"), initial_cash=1000.0)
+        ou_result = engine.run([arb_tick])
+        ou_curve = list(ou_result.equity_curve)
+
+        engine.reset(SniperStrategy(name="sniper_direct", target_price=0.50, min_gap=0.02))
+        assert engine.cash == 1000.0
+        assert engine.position == 0.0
+        sniper_result = engine.run([sniper_tick, sniper_tick])
+
+        assert sniper_result.strategy_name == "sniper_direct"
+        assert len(sniper_result.equity_curve) == 2
+        assert ou_result.total_trades == 2
+        assert list(ou_result.equity_curve) == ou_curve
@@ -0,0 +1,44 @@
+# tests/test_compare_strategies.py
+"""
+Pytest-style tests for demo_compare_strategies.run_all.
+
+Checks that the process-pool path (normally only taken for long series)
+produces the same runs as the in-process path.
+"""
+
+import pytest
+
+import demo_compare_strategies as demo
+from strategies.ai_pm import reset_state
+
+
+@pytest.fixture(autouse=True)
+def reset_ai_pm_state():
+    """Reset AI PM state before each test to ensure isolation."""
+    reset_state()
+    yield
+    reset_state()
+
+
+FACTORIES = {"ou": demo.make_ou, "sniper": demo.make_sniper, "router": demo.make_router}
+
+
+def _comparable(runs):
+    """Strategy names and run_with results, without the (per-process) instances."""
+    return {name: (strategy.name, result) for name, (strategy, result) in runs.items()}
+
+
+def test_parallel_run_all_matches_serial(monkeypatch):
+    """Forcing the ProcessPoolExecutor path gives the same results as the serial one."""
+    series = demo.build_series()
+
+    serial = demo.run_all(FACTORIES, series)
+    assert len(series) < demo.PARALLEL_MIN_TICKS
+
+    reset_state()
+    monkeypatch.setattr(demo, "PARALLEL_MIN_TICKS", 0)
+    parallel = demo.run_all(FACTORIES, series)
+
+    assert list(parallel) == list(serial)
+    assert _comparable(parallel) == _comparable(serial)
+    assert parallel["router"][1]["total_orders"] > 0
@@ -0,0 +1,441 @@
+# tests/test_news_replay.py
+"""
+Pytest-style tests for news_replay.
+
+Covers the indexed/cached helpers against the plain implementations they
+stand in for.
+"""
+
+import json
+import os
+from collections import deque
+from pathlib import Path
+
+import pytest
+
+import news_replay as nr
+
+CSV_PATH = Path(__file__).resolve().parents[1] / "data" / "news_cases.csv"
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture(scope="module")
+def cases():
+    """Cases from the bundled CSV."""
+    loaded = nr.load_news_cases(CSV_PATH)
+    assert loaded
+    return loaded
+
+
+def _filter_args(cases):
+    """Every symbol/tag/regime combination (plus None and unknown values)."""
+    symbols = sorted({c.symbol for c in cases}) + [None, "NOPE"]
+    regimes = sorted({c.regime for c in cases}) + [None, "NOPE"]
+    tags = ["Crypto", "_", "NOPE", None] + sorted({c.source_tag for c in cases})[:3]
+    return [(s, t, r) for s in symbols for t in tags for r in regimes]
+
+
+# =============================================================================
+# Index Tests
+# =============================================================================
+
+class TestCaseIndex:
+    """Tests for index_cases / filter_cases_indexed."""
+
+    def test_postings_keep_original_order(self, cases):
+        index = nr.index_cases(cases)
+        for symbol, posting in index.by_symbol.items():
+            assert posting == [c for c in cases if c.symbol == symbol]
+        for regime, posting in index.by_regime.items():
+            assert posting == [c for c in cases if c.regime == regime]
+
+    def test_indexed_filter_matches_filter_cases(self, cases):
+        index = nr.index_cases(cases)
+        for symbol, tag, regime in _filter_args(cases):
+            expected = nr.filter_cases(cases, symbol=symbol, source_tag=tag, regime=regime)
+            got = nr.filter_cases_indexed(cases, index, symbol=symbol, source_tag=tag, regime=regime)
+            assert got == expected, (symbol, tag, regime)
+
+    def test_indexed_filter_never_returns_a_posting(self, cases):
+        index = nr.index_cases(cases)
+        symbol = cases[0].symbol
+        result = nr.filter_cases_indexed(cases, index, symbol=symbol)
+        assert result is not index.by_symbol[symbol]
+
+    def test_empty_cases(self):
+        index = nr.index_cases([])
+        assert nr.filter_cases_indexed([], index, symbol="BTC", regime="trending") == []
+
+
+# =============================================================================
+# Multi-Tag Filter Tests
+# =============================================================================
+
+class TestFilterByTags:
+    """Tests for filter_cases_by_tags."""
+
+    def test_matches_filter_cases_per_tag(self, cases):
+        tags = ["Crypto", "_", "NOPE", ""] + sorted({c.source_tag for c in cases})
+        result = nr.filter_cases_by_tags(cases, tags)
+        assert list(result) == list(dict.fromkeys(tags))
+        for tag in tags:
+            assert result[tag] == nr.filter_cases(cases, source_tag=tag), tag
+
+    def test_duplicate_tags_and_generators(self, cases):
+        result = nr.filter_cases_by_tags(cases, (t for t in ["Crypto", "Crypto"]))
+        assert list(result) == ["Crypto"]
+        assert result["Crypto"] == nr.filter_cases(cases, source_tag="Crypto")
+
+    def test_empty_inputs(self, cases):
+        assert nr.filter_cases_by_tags(cases, []) == {}
+        assert nr.filter_cases_by_tags([], ["Crypto"]) == {"Crypto": []}
+
+
+# =============================================================================
+# CSV Load Cache Tests
+# =============================================================================
+
+HEADER = "case_id,symbol,event_date,news_headline,news_summary,return_1d,return_3d,return_7d,regime,source_tag\n"
+
+
+def _row(case_id, r1="0.01"):
+    return f"{case_id},BTC,2024-01-01,h,s,{r1},0.02,0.03,trending,Crypto_Test\n"
+
+
+class TestLoadCache:
+    """Tests for load_news_cases' (path, mtime, size) memoisation."""
+
+    def test_repeat_load_reuses_parse(self, tmp_path):
+        path = tmp_path / "cases.csv"
+        path.write_text(HEADER + _row("a"), encoding="utf-8")
+        first = nr.load_news_cases(path)
+        second = nr.load_news_cases(path)
+        assert first == second
+        assert first is not second          # Fresh list per call...
+        assert first[0] is second[0]        # ...over the same parsed cases
+
+    def test_size_change_invalidates(self, tmp_path):
+        path = tmp_path / "cases.csv"
+        path.write_text(HEADER + _row("a"), encoding="utf-8")
+        assert [c.case_id for c in nr.load_news_cases(path)] == ["a"]
+        path.write_text(HEADER + _row("a") + _row("b"), encoding="utf-8")
+        assert [c.case_id for c in nr.load_news_cases(path)] == ["a", "b"]
+
+    def test_mtime_change_invalidates(self, tmp_path):
+        path = tmp_path / "cases.csv"
+        path.write_text(HEADER + _row("a", "0.01"), encoding="utf-8")
+        stat = path.stat()
+        assert nr.load_news_cases(path)[0].return_1d == 0.01
+
+        # Same size, new content: only the mtime tells the versions apart
+        path.write_text(HEADER + _row("a", "0.09"), encoding="utf-8")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert path.stat().st_size == stat.st_size
+        assert nr.load_news_cases(path)[0].return_1d == 0.09
+
+    def test_missing_file_returns_empty(self, tmp_path):
+        assert nr.load_news_cases(tmp_path / "missing.csv") == []
+
+
+# =============================================================================
+# LLM Response Cache Tests
+# =============================================================================
+
+@pytest.fixture
+def llm_cache(tmp_path, monkeypatch):
+    """Point the LLM pattern store at a fresh tmp-path database."""
+    path = tmp_path / "cache" / "llm.sqlite3"
+    monkeypatch.setattr(nr, "_LLM_CACHE_PATH", str(path))
+    nr._llm_cache_db.cache_clear()
+    yield path
+    nr._llm_cache_db.cache_clear()
+
+
+class _StubModels:
+    """generate_content stand-in returning a fixed JSON reply."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, model, contents):
+        self.calls += 1
+        return type("Reply", (), {"text": '{"pattern_name": "stub", "confidence_level": "high"}'})()
+
+
+@pytest.fixture
+def stub_gemini(monkeypatch):
+    """Enable the LLM path with a stub client and no rate limit."""
+    models = _StubModels()
+    client = type("Client", (), {"models": models})()
+    monkeypatch.setattr(nr, "_USE_LLM_DEFAULT", True)
+    monkeypatch.setattr(nr, "_GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(nr, "get_gemini_client", lambda: client)
+    monkeypatch.setattr(nr, "_try_acquire_llm_slot", lambda prompt="": None)
+    return models
+
+
+class TestLLMCache:
+    """Tests for the persistent LLM pattern store."""
+
+    PAYLOAD = [{"symbol": "BTC", "summary": "s", "return_1d": 0.01}]
+
+    def test_miss_then_hit(self, llm_cache):
+        key = nr._llm_cache_key(self.PAYLOAD)
+        assert nr._llm_cache_get(key) is None
+        nr._llm_cache_put(key, {"pattern_name": "x", "avg_return_1d": 0.5})
+        assert nr._llm_cache_get(key) == {"pattern_name": "x", "avg_return_1d": 0.5}
+        assert llm_cache.exists()
+
+    def test_ttl_expiry(self, llm_cache, monkeypatch):
+        key = nr._llm_cache_key(self.PAYLOAD)
+        nr._llm_cache_put(key, {"pattern_name": "x"})
+        monkeypatch.setattr(nr, "_LLM_CACHE_TTL_SECONDS", -1.0)
+        assert nr._llm_cache_get(key) is None
+
+    def test_put_prunes_expired_rows(self, llm_cache):
+        db = nr._llm_cache_db()
+        db.execute("INSERT INTO llm_patterns (key, value, ts) VALUES ('old', '{}', 0)")
+        nr._llm_cache_put("new", {"pattern_name": "new"})
+        keys = [row[0] for row in db.execute("SELECT key FROM llm_patterns")]
+        assert keys == ["new"]
+
+    def test_key_depends_on_payload_model_and_prompt(self, monkeypatch):
+        base = nr._llm_cache_key(self.PAYLOAD)
+        assert nr._llm_cache_key(list(self.PAYLOAD)) == base
+        assert nr._llm_cache_key([{**self.PAYLOAD[0], "return_1d": 0.02}]) != base
+        monkeypatch.setattr(nr, "_GEMINI_MODEL", "other-model")
+        assert nr._llm_cache_key(self.PAYLOAD) != base
+        monkeypatch.undo()
+        monkeypatch.setattr(nr, "_PATTERN_PROMPT_HEADER", nr._PATTERN_PROMPT_HEADER + "v2\n")
+        assert nr._llm_cache_key(self.PAYLOAD) != base
+
+    def test_corrupt_row_is_a_miss(self, llm_cache):
+        nr._llm_cache_put("k", {"pattern_name": "x"})
+        nr._llm_cache_db().execute("UPDATE llm_patterns SET value = '{not json' WHERE key = 'k'")
+        assert nr._llm_cache_get("k") is None
+        nr._llm_cache_put("k", {"pattern_name": "y"})
+        assert nr._llm_cache_get("k") == {"pattern_name": "y"}
+
+    def test_unreadable_db_is_a_miss(self, llm_cache):
+        llm_cache.parent.mkdir(parents=True)
+        llm_cache.write_bytes(b"this is not a sqlite database" * 100)
+        nr._llm_cache_put("k", {"pattern_name": "x"})  # Swallowed
+        assert nr._llm_cache_get("k") is None
+
+    def test_repeat_analysis_served_from_cache(self, llm_cache, stub_gemini, cases):
+        first = nr.analyze_pattern_with_llm(cases[:3], force_llm=True)
+        second = nr.analyze_pattern_with_llm(cases[:3], force_llm=True)
+        assert stub_gemini.calls == 1
+        assert first["analysis_method"] == second["analysis_method"] == "llm"
+        assert "local cache" in second["note"]
+        assert {k: v for k, v in second.items() if k != "note"} == {
+            k: v for k, v in first.items() if k != "note"
+        }
+
+
+# =============================================================================
+# Similar-Sample Reuse Tests (AI_PM_SEMCACHE)
+# =============================================================================
+
+@pytest.fixture
+def semcache(monkeypatch):
+    """Empty in-process store for similar-sample reuse."""
+    store = deque(maxlen=nr._SEMCACHE.maxlen)
+    monkeypatch.setattr(nr, "_SEMCACHE", store)
+    return store
+
+
+class TestSemCache:
+    """Tests for the summary-overlap pattern reuse."""
+
+    def test_overlap_threshold(self, semcache):
+        semcache.append((frozenset("abcde"), {"pattern_name": "p"}))
+        assert nr._semcache_lookup(frozenset("abcd"))["pattern_name"] == "p"   # 4/5 = 0.8
+        assert nr._semcache_lookup(frozenset("abcdx")) is not None              # 4/5
+        assert nr._semcache_lookup(frozenset("abcxy")) is None                  # 3/5
+        assert nr._semcache_lookup(frozenset("abc")) is None                    # 3/5
+        assert nr._semcache_lookup(frozenset("abcdefg")) is None                # 5/7
+
+    def test_best_overlap_wins(self, semcache):
+        semcache.append((frozenset("abcdx"), {"pattern_name": "close"}))
+        semcache.append((frozenset("abcde"), {"pattern_name": "exact"}))
+        assert nr._semcache_lookup(frozenset("abcde"))["pattern_name"] == "exact"
+
+    def test_empty_sets(self, semcache):
+        assert nr._semcache_lookup(frozenset("abc")) is None
+        semcache.append((frozenset("abc"), {"pattern_name": "p"}))
+        assert nr._semcache_lookup(frozenset()) is None
+
+    def test_gate_off_never_reuses(self, llm_cache, stub_gemini, semcache, cases, monkeypatch):
+        monkeypatch.setattr(nr, "_SEMCACHE_ENABLED", False)
+        nr.analyze_pattern_with_llm(cases[:5], force_llm=True)
+        nr.analyze_pattern_with_llm(cases[1:5], force_llm=True)
+        assert stub_gemini.calls == 2
+        assert len(semcache) == 0
+
+    def test_gate_on_reuses_with_sample_numbers(self, llm_cache, stub_gemini, semcache, cases, monkeypatch):
+        monkeypatch.setattr(nr, "_SEMCACHE_ENABLED", True)
+        nr.analyze_pattern_with_llm(cases[:5], force_llm=True)
+        reused = nr.analyze_pattern_with_llm(cases[1:5], force_llm=True)
+        assert stub_gemini.calls == 1
+        assert reused["pattern_name"] == "stub"
+        assert "similar case set" in reused["note"]
+        assert reused["avg_return_1d"] == nr.summarize_cases(cases[1:5])["avg_return_1d"]
+        assert reused["semcache"] is True
+        assert reused["analysis_method"] == "llm"
+
+    def test_reused_patterns_are_not_persisted(self, llm_cache, stub_gemini, semcache, cases, monkeypatch):
+        monkeypatch.setattr(nr, "_SEMCACHE_ENABLED", True)
+        first = nr.analyze_pattern_with_llm(cases[:5], force_llm=True)
+        reused = nr.analyze_pattern_with_llm(cases[1:5], force_llm=True)
+        nr._remember_llm_pattern("reused", cases[1:5], reused)
+
+        rows = nr._llm_cache_db().execute("SELECT COUNT(*) FROM llm_patterns").fetchone()[0]
+        assert rows == 1
+        assert nr._llm_cache_get("reused") is None
+        assert len(semcache) == 1
+        assert "semcache" not in first
+
+
+# =============================================================================
+# Batched Pattern Analysis Tests
+# =============================================================================
+
+class _BatchModels:
+    """generate_content stand-in answering every group but the `missing` ones."""
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.prompts = []
+
+    def generate_content(self, model, contents):
+        self.prompts.append(contents)
+        groups = json.loads(contents.split("历史样本 JSON 对象如下：\n", 1)[1])
+        reply = {
+            name: {"pattern_name": f"p_{name}", "confidence_level": "medium"}
+            for name in groups if name not in self.missing
+        }
+        return type("Reply", (), {"text": "```json\n" + json.dumps(reply) + "\n```"})()
+
+
+@pytest.fixture
+def batch_gemini(stub_gemini, monkeypatch):
+    """Stub client that answers batch prompts (LLM path enabled, no rate limit)."""
+    models = _BatchModels(missing={"TSLA"})
+    client = type("Client", (), {"models": models})()
+    monkeypatch.setattr(nr, "get_gemini_client", lambda: client)
+    return models
+
+
+class TestBatchAnalysis:
+    """Tests for analyze_patterns_with_llm_batch."""
+
+    def _groups(self, cases):
+        index = nr.index_cases(cases)
+        return {s: index.by_symbol[s] for s in ("BLUE", "BTC", "TSLA")} | {"EMPTY": []}
+
+    def test_without_llm_matches_single_calls(self, cases):
+        groups = self._groups(cases)
+        batch = nr.analyze_patterns_with_llm_batch(groups)
+        assert batch == {name: nr.analyze_pattern_with_llm(g) for name, g in groups.items()}
+
+    def test_one_call_for_all_groups(self, llm_cache, batch_gemini, cases):
+        groups = self._groups(cases)
+        result = nr.analyze_patterns_with_llm_batch(groups, force_llm=True)
+
+        assert len(batch_gemini.prompts) == 1
+        assert list(result) == list(groups)
+        for name in ("BLUE", "BTC"):
+            assert result[name]["analysis_method"] == "llm"
+            assert result[name]["pattern_name"] == f"p_{name}"
+            assert "p_BLUE" in result[name]["raw_llm_text"]  # The model's reply, not a re-dump
+        assert result["TSLA"]["analysis_method"] == "rule_based_fallback"
+        assert result["EMPTY"]["pattern_name"] == "no_data"
+
+    def test_cached_groups_are_not_resent(self, llm_cache, batch_gemini, cases):
+        groups = self._groups(cases)
+        nr.analyze_patterns_with_llm_batch(groups, force_llm=True)
+        again = nr.analyze_patterns_with_llm_batch(groups, force_llm=True)
+
+        assert len(batch_gemini.prompts) == 2
+        assert '"BLUE"' not in batch_gemini.prompts[1]  # Only TSLA was still pending
+        assert "local cache" in again["BLUE"]["note"]
+
+    def test_rate_limited_batch_falls_back(self, llm_cache, batch_gemini, cases, monkeypatch):
+        monkeypatch.setattr(nr, "_try_acquire_llm_slot", lambda prompt="": 12.0)
+        result = nr.analyze_patterns_with_llm_batch(self._groups(cases), force_llm=True)
+        assert batch_gemini.prompts == []
+        assert all(p["analysis_method"] != "llm" for p in result.values())
+        assert "rate limits" in result["BTC"]["note"]
+
+    def test_bad_reply_falls_back(self, llm_cache, stub_gemini, cases):
+        # stub_gemini answers with a flat pattern object, not {group: pattern}
+        result = nr.analyze_patterns_with_llm_batch(self._groups(cases), force_llm=True)
+        assert result["BTC"]["analysis_method"] == "rule_based_fallback"
+
+
+# =============================================================================
+# Rate Limiter Tests
+# =============================================================================
+
+class TestTokenBucket:
+    """Tests for _TokenBucket and the AI_PM_GEMINI_RPM/TPM parsing."""
+
+    def _bucket(self, per_minute):
+        bucket = nr._TokenBucket(per_minute)
+        bucket.updated_at = 0.0
+        return bucket
+
+    def test_full_bucket_allows_a_burst(self):
+        bucket = self._bucket(60)
+        assert bucket.wait_time(60, 0.0) == 0.0
+        bucket.take(60)
+        assert bucket.wait_time(1, 0.0) == pytest.approx(1.0)
+
+    def test_refills_over_time(self):
+        bucket = self._bucket(60)  # 1 token per second
+        bucket.take(60)
+        assert bucket.wait_time(5, 3.0) == pytest.approx(2.0)
+        assert bucket.wait_time(5, 5.0) == 0.0
+
+    def test_refill_is_capped_at_capacity(self):
+        bucket = self._bucket(4)
+        bucket.take(4)
+        assert bucket.wait_time(1, 3600.0) == 0.0
+        assert bucket.tokens == 4
+
+    def test_request_larger_than_capacity_waits_for_a_full_bucket(self):
+        bucket = self._bucket(60)
+        bucket.take(30)
+        assert bucket.wait_time(1000, 0.0) == pytest.approx(30.0)
+        assert bucket.wait_time(1000, 30.0) == 0.0
+        bucket.take(1000)
+        assert bucket.tokens == 0
+
+    @pytest.mark.parametrize("per_minute", [0, 0.0, -5])
+    def test_zero_or_negative_rate_disables_the_limit(self, per_minute):
+        bucket = self._bucket(per_minute)
+        for _ in range(3):
+            assert bucket.wait_time(10, 0.0) == 0.0
+            bucket.take(10)
+
+    @pytest.mark.parametrize("raw, expected", [
+        (None, 4.0),
+        ("10", 10.0),
+        ("2.5", 2.5),
+        ("0", 0.0),
+        ("-3", 0.0),
+        ("inf", 0.0),
+        ("nan", 4.0),
+        ("fast", 4.0),
+        ("", 4.0),
+    ])
+    def test_env_rate_parsing(self, monkeypatch, raw, expected):
+        if raw is None:
+            monkeypatch.delenv("AI_PM_GEMINI_RPM", raising=False)
+        else:
+            monkeypatch.setenv("AI_PM_GEMINI_RPM", raw)
+        assert nr._env_rate("AI_PM_GEMINI_RPM", 4.0) == expected
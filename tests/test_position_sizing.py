@@ -0,0 +1,45 @@
+# tests/test_position_sizing.py
+"""
+Pytest-style tests for infra.position_sizing.
+
+Checks that the batch Kelly API matches the scalar one element by element.
+"""
+
+import pytest
+
+from infra.position_sizing import calculate_kelly_position, calculate_kelly_position_batch
+
+
+KEYS = ("fraction_raw", "fraction_half", "fraction_applied", "notional")
+
+# Includes out-of-range confidences (clamped to [0, 1]) and the 0 / 0.5 / 1 edges
+CONFIDENCES = [-0.5, 0.0, 0.1, 1 / 3, 0.5, 0.65, 0.9, 1.0, 1.7]
+
+
+@pytest.mark.parametrize("win_loss_ratio", [2.0, 1.2, 1.0, 0.0, -1.0])
+@pytest.mark.parametrize("max_fraction", [0.20, 0.05, 1.0])
+def test_batch_matches_scalar(win_loss_ratio, max_fraction):
+    """Every key matches calculate_kelly_position for each confidence, in order."""
+    batch = calculate_kelly_position_batch(
+        10_000.0, CONFIDENCES, win_loss_ratio=win_loss_ratio, max_fraction=max_fraction
+    )
+    for i, confidence in enumerate(CONFIDENCES):
+        scalar = calculate_kelly_position(
+            10_000.0, confidence, win_loss_ratio=win_loss_ratio, max_fraction=max_fraction
+        )
+        for key in KEYS:
+            assert batch[key][i] == scalar[key]
+
+
+def test_batch_clamps_applied_fraction():
+    """Applied fractions stay within [0, max_fraction], even at zero odds."""
+    batch = calculate_kelly_position_batch(10_000.0, CONFIDENCES, win_loss_ratio=0.0)
+    assert all(0.0 <= f <= 0.20 for f in batch["fraction_applied"])
+    assert batch["notional"][0] == 0.0
+    assert batch["notional"][-1] == pytest.approx(2000.0)
+
+
+def test_batch_accepts_any_iterable_and_empty_input():
+    """Generators work, and no confidences give empty lists."""
+    assert calculate_kelly_position_batch(1.0, (c for c in [0.65]))["notional"] == [0.2]
+    assert calculate_kelly_position_batch(1.0, []) == {key: [] for key in KEYS}